@@ -5,13 +5,24 @@ import matplotlib.pyplot as plt
 import numpy as np
 import mss
 import time
+import argparse
 import cv2
 import os
 import datetime
 import threading
 import json
+import re
 import queue
 import socket
+import sys
+import ctypes
+import ctypes.util
+import mmap
+import pickle
+import multiprocessing
+from multiprocessing import shared_memory
+import select
+from concurrent.futures import ThreadPoolExecutor
 
 # Try to import temscript, but don't fail if not available
 try:
@@ -27,7 +38,41 @@ try:
 except ImportError:
     YOLO_AVAILABLE = False
 
+# Optional CPU inference runtimes for exported YOLO models
+try:
+    import onnxruntime
+    ONNXRUNTIME_AVAILABLE = True
+except ImportError:
+    ONNXRUNTIME_AVAILABLE = False
+
+try:
+    import openvino
+    OPENVINO_AVAILABLE = True
+except ImportError:
+    OPENVINO_AVAILABLE = False
+
+# Try to import tifffile for memory-mapped TIFF replay, fall back to OpenCV
+try:
+    import tifffile
+    TIFFFILE_AVAILABLE = True
+except ImportError:
+    TIFFFILE_AVAILABLE = False
+
+# V4L2 capture needs Linux ioctls
+try:
+    import fcntl
+    V4L2_AVAILABLE = sys.platform.startswith('linux')
+except ImportError:
+    V4L2_AVAILABLE = False
+
+# Change-driven screen capture needs Xlib with the MIT-SHM and DAMAGE extensions
+XSHM_AVAILABLE = sys.platform.startswith('linux') and all(
+    ctypes.util.find_library(lib) for lib in ('X11', 'Xext', 'Xdamage'))
+
 CONFIG_FILE = "configure.json"
+SCREEN_SOURCES = ('mss', 'xshm')
+DEVICE_CACHE_FILE = "device_cache.json"
+YOLO_BACKENDS = ('pytorch', 'onnxruntime', 'openvino')
 
 
 class ScrollableFrame(ttk.Frame):
@@ -58,6 +103,1782 @@ class ScrollableFrame(ttk.Frame):
         self.canvas.yview_scroll(int(-event.delta / 120), "units")
 
 
+def crop_roi(frame, x, y, w, h, gray, out=None):
+    """Crop frame to the (x, y, w, h) region, optionally converting BGR to gray.
+
+    Parts of the region outside the frame are zero-padded. The result is written into
+    out when its shape and dtype match, so callers can reuse a buffer across frames.
+    """
+    frame_h, frame_w = frame.shape[:2]
+    x = min(x, frame_w - 1)
+    y = min(y, frame_h - 1)
+    cropped = frame[y:min(y + h, frame_h), x:min(x + w, frame_w)]
+
+    shape = (h, w) if gray else (h, w) + frame.shape[2:]
+    if out is None or out.shape != shape or out.dtype != frame.dtype:
+        out = np.empty(shape, dtype=frame.dtype)
+
+    ch, cw = cropped.shape[:2]
+    if ch < h or cw < w:
+        out.fill(0)
+    if gray and frame.ndim == 3:
+        cv2.cvtColor(cropped, cv2.COLOR_BGR2GRAY, dst=out[:ch, :cw])
+    else:
+        out[:ch, :cw] = cropped
+    return out
+
+
+def parse_roi_spec(spec, width, height):
+    """Regions (x, y, w, h) of a width x height frame from a multi-ROI spec.
+
+    The spec is either a grid such as "2x1" (columns x rows, row by row) or a list of
+    pixel rectangles "x,y,w,h; x,y,w,h". Rectangles are clipped to the frame; raises
+    ValueError for anything else or when no region is left.
+    """
+    spec = spec.replace(' ', '').lower()
+    rois = []
+    if 'x' in spec and ',' not in spec:
+        cols, rows = (int(n) for n in spec.split('x'))
+        if cols < 1 or rows < 1:
+            raise ValueError(f"Bad grid: {spec}")
+        for r in range(rows):
+            for c in range(cols):
+                x0, x1 = width * c // cols, width * (c + 1) // cols
+                y0, y1 = height * r // rows, height * (r + 1) // rows
+                rois.append((x0, y0, x1 - x0, y1 - y0))
+    else:
+        for part in filter(None, spec.split(';')):
+            x, y, w, h = (int(n) for n in part.split(','))
+            x0, y0 = max(x, 0), max(y, 0)
+            x1, y1 = min(x + w, width), min(y + h, height)
+            if x1 - x0 > 0 and y1 - y0 > 0:
+                rois.append((x0, y0, x1 - x0, y1 - y0))
+    if not rois:
+        raise ValueError(f"No region in multi-ROI spec: {spec}")
+    return rois
+
+
+def gaussian_box_sizes(ksize, passes=3):
+    """Odd box widths whose repeated application approximates GaussianBlur with this kernel size"""
+    # Same sigma OpenCV derives for GaussianBlur when sigma is 0
+    sigma = 0.3 * ((ksize - 1) * 0.5 - 1) + 0.8
+    ideal = np.sqrt(12 * sigma ** 2 / passes + 1)
+    lower = int(ideal)
+    if lower % 2 == 0:
+        lower -= 1
+    upper = lower + 2
+    # Number of passes using the lower width so the summed variance matches sigma^2
+    m = round((12 * sigma ** 2 - passes * lower ** 2 - 4 * passes * lower - 3 * passes) / (-4 * lower - 4))
+    return [lower if i < m else upper for i in range(passes)]
+
+
+def box_gaussian_blur(src, ksize, dst=None, tmp=None):
+    """Approximate GaussianBlur(src, (ksize, ksize), 0) with three box filters.
+
+    cv2.blur keeps running sums, so the cost per pixel does not grow with the kernel size.
+    For kernels of 15 and up the result is within 4 gray levels (mean < 0.25) of GaussianBlur.
+    """
+    b1, b2, b3 = gaussian_box_sizes(ksize)
+    dst = cv2.blur(src, (b1, b1), dst=dst)
+    tmp = cv2.blur(dst, (b2, b2), dst=tmp)
+    return cv2.blur(tmp, (b3, b3), dst=dst)
+
+
+def benchmark_blur(size=512, kernels=(5, 9, 15, 21, 31, 51, 71, 101), repeats=50):
+    """Print GaussianBlur vs box_gaussian_blur timings and errors over a range of blur values"""
+    rng = np.random.default_rng(0)
+    img = cv2.GaussianBlur(rng.integers(0, 256, (size, size), dtype=np.uint8), (7, 7), 0)
+    cv2.circle(img, (size // 2, size // 2), size // 8, 30, -1)
+    images = {'uint8': img, 'float32': img.astype('float32') / 255}
+
+    print(f"{'dtype':>8} {'blur':>5} {'gauss ms':>9} {'box ms':>7} {'speedup':>8} {'max err':>8} {'mean err':>9}")
+    for dtype, image in images.items():
+        scale = 255 if dtype == 'float32' else 1
+        dst = np.empty_like(image)
+        tmp = np.empty_like(image)
+        for k in kernels:
+            start = time.perf_counter()
+            for _ in range(repeats):
+                reference = cv2.GaussianBlur(image, (k, k), 0)
+            t_gauss = (time.perf_counter() - start) / repeats
+
+            start = time.perf_counter()
+            for _ in range(repeats):
+                box_gaussian_blur(image, k, dst=dst, tmp=tmp)
+            t_box = (time.perf_counter() - start) / repeats
+
+            err = np.abs(reference.astype('float32') - dst.astype('float32')) * scale
+            print(f"{dtype:>8} {k:>5} {t_gauss * 1e3:>9.2f} {t_box * 1e3:>7.2f} {t_gauss / t_box:>7.1f}x "
+                  f"{err.max():>8.2f} {err.mean():>9.3f}")
+
+
+class KalmanTracker:
+    """Constant-velocity Kalman tracks with persistent IDs and a locked target.
+
+    All tracks are predicted and corrected together as arrays. Detections are assigned to
+    tracks nearest-first by distance to the predicted position, within a gating radius.
+    The target is the track of the largest detection when nothing is locked, and stays
+    locked until its track has gone unmatched for more than max_missed updates.
+    """
+
+    def __init__(self, gate=50.0, max_missed=10, max_gap=1.0, accel_noise=500.0, measurement_noise=4.0):
+        self.gate = gate  # pixels
+        self.max_missed = max_missed
+        self.max_gap = max_gap  # seconds without updates before all tracks are dropped
+        self.accel_noise = accel_noise  # px/s^2 variance driving the velocity
+        self.measurement_noise = measurement_noise  # px^2 centroid variance
+        self.reset()
+
+    def reset(self):
+        self.ids = np.empty(0, dtype=int)
+        self.x = np.empty((0, 4))  # x, y, vx, vy
+        self.P = np.empty((0, 4, 4))
+        self.missed = np.empty(0, dtype=int)
+        self.next_id = 1
+        self.target_id = None
+        self.last_time = None
+
+    def predict(self, dt):
+        F = np.eye(4)
+        F[0, 2] = F[1, 3] = dt
+        # White-noise acceleration model
+        q = self.accel_noise
+        Q = np.zeros((4, 4))
+        Q[[0, 1], [0, 1]] = q * dt ** 4 / 4
+        Q[[0, 1], [2, 3]] = Q[[2, 3], [0, 1]] = q * dt ** 3 / 2
+        Q[[2, 3], [2, 3]] = q * dt ** 2
+        self.x = self.x @ F.T
+        self.P = F @ self.P @ F.T + Q
+
+    def assign(self, z):
+        """Track index for each detection (-1 if unmatched), pairing the closest ones first"""
+        det_track = np.full(len(z), -1)
+        if not len(self.ids) or not len(z):
+            return det_track
+        dist = np.linalg.norm(self.x[:, None, :2] - z[None, :, :], axis=2)
+        dist[dist > self.gate] = np.inf
+        tracks = np.arange(len(self.ids))
+        # Pairs that are each other's nearest are exactly those closest-first pairing picks next;
+        # take them all at once and repeat on the rest, which rarely needs more than two rounds
+        while True:
+            nearest_det = np.argmin(dist, axis=1)
+            mutual = np.isfinite(dist[tracks, nearest_det]) & (np.argmin(dist, axis=0)[nearest_det] == tracks)
+            if not mutual.any():
+                return det_track
+            t, j = tracks[mutual], nearest_det[mutual]
+            det_track[j] = t
+            dist[t, :] = np.inf
+            dist[:, j] = np.inf
+
+    def update(self, centroids, largest_index, timestamp):
+        """Advance tracks to timestamp, fold in detections, and return the target's detection index or None"""
+        if self.last_time is not None:
+            dt = timestamp - self.last_time
+            if dt < 0 or dt > self.max_gap:
+                self.reset()
+            elif dt > 0:
+                self.predict(dt)
+        self.last_time = timestamp
+
+        z = np.asarray(centroids, dtype=float).reshape(-1, 2)
+        det_track = self.assign(z)
+        matched_det = np.flatnonzero(det_track >= 0)
+        matched = det_track[matched_det]
+
+        if len(matched):
+            P = self.P[matched]
+            S = P[:, :2, :2] + self.measurement_noise * np.eye(2)
+            K = P[:, :, :2] @ np.linalg.inv(S)
+            innovation = z[matched_det] - self.x[matched, :2]
+            self.x[matched] += (K @ innovation[..., None])[..., 0]
+            self.P[matched] = P - K @ P[:, :2, :]
+        self.missed += 1
+        self.missed[matched] = 0
+
+        det_ids = np.zeros(len(z), dtype=int)
+        det_ids[matched_det] = self.ids[matched]
+
+        # Unmatched detections start new tracks at rest with an uncertain velocity
+        new_det = np.flatnonzero(det_track < 0)
+        if len(new_det):
+            new_ids = self.next_id + np.arange(len(new_det))
+            self.next_id += len(new_det)
+            det_ids[new_det] = new_ids
+            x_new = np.zeros((len(new_det), 4))
+            x_new[:, :2] = z[new_det]
+            P_new = np.tile(np.diag([self.measurement_noise] * 2 + [self.gate ** 2] * 2), (len(new_det), 1, 1))
+            self.ids = np.concatenate([self.ids, new_ids])
+            self.x = np.concatenate([self.x, x_new])
+            self.P = np.concatenate([self.P, P_new])
+            self.missed = np.concatenate([self.missed, np.zeros(len(new_det), dtype=int)])
+
+        alive = self.missed <= self.max_missed
+        self.ids, self.x, self.P, self.missed = self.ids[alive], self.x[alive], self.P[alive], self.missed[alive]
+
+        if self.target_id is not None and self.target_id not in self.ids:
+            self.target_id = None
+        if self.target_id is None and largest_index is not None:
+            self.target_id = int(det_ids[largest_index])
+
+        target_det = np.flatnonzero(det_ids == self.target_id)
+        return int(target_det[0]) if len(target_det) else None
+
+    def target_position(self, timestamp, max_horizon=0.5):
+        """Target (x, y) extrapolated to timestamp, or None unless it was matched on the last update"""
+        if self.target_id is None:
+            return None
+        i = np.flatnonzero(self.ids == self.target_id)[0]
+        if self.missed[i]:
+            return None
+        dt = min(max(timestamp - self.last_time, 0.0), max_horizon)
+        return self.x[i, :2] + self.x[i, 2:] * dt
+
+
+class PhaseCorrelator:
+    """Drift estimate by FFT phase correlation against a reference frame.
+
+    Frames are area-resized to a fixed size, mean-subtracted and apodized with a cached
+    Hanning window before a real FFT, so the transform size, and numpy's cached FFT plan,
+    never change. The reference spectrum is computed once per reference instead of every
+    frame. The correlation peak is refined to sub-pixel precision with a parabolic fit.
+    """
+
+    def __init__(self, size=256):
+        self.size = size
+        self.window = cv2.createHanningWindow((size, size), cv2.CV_32F)
+        self.patch = np.empty((size, size), dtype=np.float32)
+        self.spectrum = None
+        self.ref_spectrum = None
+        self.surface = None
+        self.response = 0.0
+
+    def prepare(self, img):
+        """Resize, remove the mean, apodize and transform a frame"""
+        small = cv2.resize(img, (self.size, self.size), interpolation=cv2.INTER_AREA)
+        np.subtract(small, np.float32(small.mean()), out=self.patch, casting='unsafe')
+        self.patch *= self.window
+        self.spectrum = np.fft.rfft2(self.patch)
+
+    def set_reference(self):
+        """Use the last prepared frame as the reference"""
+        if self.spectrum is not None:
+            self.ref_spectrum = self.spectrum.copy()
+
+    @staticmethod
+    def refine(left, peak, right):
+        """Sub-pixel offset of a peak from its two neighbours (parabolic fit)"""
+        denom = left - 2 * peak + right
+        return 0.5 * (left - right) / denom if denom < 0 else 0.0
+
+    def estimate(self, img):
+        """Shift (dx, dy) of img relative to the reference, in img pixels, and the peak response"""
+        self.prepare(img)
+        if self.ref_spectrum is None:
+            self.set_reference()
+
+        # Normalized cross-power spectrum keeps only the phase difference
+        cross = self.spectrum * np.conj(self.ref_spectrum)
+        cross /= np.abs(cross) + 1e-12
+        self.surface = np.fft.irfft2(cross, s=(self.size, self.size))
+
+        n = self.size
+        iy, ix = np.unravel_index(int(np.argmax(self.surface)), self.surface.shape)
+        c = self.surface
+        self.response = float(c[iy, ix])
+        dy = iy + self.refine(c[(iy - 1) % n, ix], c[iy, ix], c[(iy + 1) % n, ix])
+        dx = ix + self.refine(c[iy, (ix - 1) % n], c[iy, ix], c[iy, (ix + 1) % n])
+        # Peaks past the middle are negative shifts
+        dy = dy - n if dy >= n / 2 else dy
+        dx = dx - n if dx >= n / 2 else dx
+
+        scale_x = img.shape[1] / n
+        scale_y = img.shape[0] / n
+        return dx * scale_x, dy * scale_y, self.response
+
+
+def letterbox(img, size, out=None):
+    """Resize img to fit a size x size square, centered on ultralytics' gray (114) padding.
+
+    Returns the padded image, the scale factor and the (x, y) padding, which map boxes back
+    to img coordinates as (box - pad) / scale.
+    """
+    h, w = img.shape[:2]
+    scale = min(size / h, size / w)
+    new_w, new_h = int(round(w * scale)), int(round(h * scale))
+    pad_x, pad_y = (size - new_w) // 2, (size - new_h) // 2
+
+    if out is None or out.shape != (size, size) + img.shape[2:]:
+        out = np.empty((size, size) + img.shape[2:], dtype=img.dtype)
+    out.fill(114)
+    cv2.resize(img, (new_w, new_h), dst=out[pad_y:pad_y + new_h, pad_x:pad_x + new_w],
+               interpolation=cv2.INTER_LINEAR)
+    return out, scale, (pad_x, pad_y)
+
+
+def nms(boxes, scores, iou_threshold):
+    """Greedy non-maximum suppression on xyxy boxes; returns kept indices, best first"""
+    x1, y1, x2, y2 = boxes.T
+    areas = (x2 - x1) * (y2 - y1)
+    order = np.argsort(scores)[::-1]
+    keep = []
+    while len(order):
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        # IoU of the best box against all remaining ones at once
+        w = np.clip(np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]), 0, None)
+        h = np.clip(np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]), 0, None)
+        inter = w * h
+        iou = inter / (areas[i] + areas[rest] - inter + 1e-9)
+        order = rest[iou <= iou_threshold]
+    return np.array(keep, dtype=int)
+
+
+def decode_yolo_output(output, conf, iou_threshold=0.7, max_det=300):
+    """Boxes (xyxy) and scores from a raw YOLOv8-style (1, 4 + classes, anchors) output"""
+    pred = output[0].T  # anchors x (cx, cy, w, h, class scores...)
+    class_scores = pred[:, 4:]
+    classes = class_scores.argmax(axis=1)
+    scores = class_scores[np.arange(len(pred)), classes]
+    mask = scores >= conf
+    pred, scores, classes = pred[mask], scores[mask], classes[mask]
+    if not len(pred):
+        return np.empty((0, 4), dtype=np.float32), np.empty(0, dtype=np.float32), np.empty(0, dtype=int)
+
+    boxes = np.empty((len(pred), 4), dtype=np.float32)
+    boxes[:, :2] = pred[:, :2] - pred[:, 2:4] / 2
+    boxes[:, 2:] = pred[:, :2] + pred[:, 2:4] / 2
+    # Offset boxes per class so NMS only suppresses within a class
+    keep = nms(boxes + classes[:, None] * 4096.0, scores, iou_threshold)[:max_det]
+    return boxes[keep], scores[keep], classes[keep]
+
+
+def filter_detections(boxes, classes, img_size, margin, area_lb, area_ub, class_ids=None, offset=(0, 0)):
+    """Drop detections touching the margin, outside the area bounds or of unwanted classes.
+
+    Works on whole arrays; returns centroids and integer bboxes as lists of tuples, shifted by
+    offset when the boxes come from a crop, plus the index of the largest remaining box.
+    """
+    b = boxes.astype(int)
+    x1, y1, x2, y2 = b.T
+    areas = (x2 - x1) * (y2 - y1)
+    keep = (x1 >= margin) & (y1 >= margin) & (x2 <= img_size - margin) & (y2 <= img_size - margin)
+    keep &= (areas >= area_lb) & (areas <= area_ub)
+    if class_ids:
+        keep &= np.isin(classes, class_ids)
+
+    b = b[keep] + (offset[0], offset[1], offset[0], offset[1])
+    centroids = [tuple(c) for c in ((b[:, :2] + b[:, 2:]) // 2).tolist()]
+    bboxes = [tuple(box) for box in b.tolist()]
+    largest_index = int(np.argmax(areas[keep])) if len(b) else None
+    return centroids, bboxes, largest_index
+
+
+class UltralyticsBackend:
+    """YOLO inference through ultralytics/PyTorch (.pt models)"""
+
+    batch_dynamic = True
+
+    def __init__(self, model_path, intra_threads=0, inter_threads=0):
+        import torch
+        if intra_threads:
+            torch.set_num_threads(intra_threads)
+        if inter_threads:
+            try:
+                torch.set_num_interop_threads(inter_threads)
+            except RuntimeError:
+                pass  # only settable before the first parallel op in this process
+        self.model = YOLO(model_path)
+
+    def predict(self, img_rgb, conf, imgsz=None):
+        """Boxes (xyxy, image pixels), scores and class ids of detections above conf"""
+        return self.predict_batch([img_rgb], conf, imgsz)[0]
+
+    def predict_batch(self, imgs, conf, imgsz=None):
+        """predict() for several same-size images in one forward pass"""
+        predictions = []
+        kwargs = {'imgsz': imgsz} if imgsz else {}
+        for result in self.model(list(imgs), conf=conf, verbose=False, **kwargs):
+            if result.boxes is None:
+                predictions.append((np.empty((0, 4), dtype=np.float32), np.empty(0, dtype=np.float32),
+                                    np.empty(0, dtype=int)))
+                continue
+            # One device-to-host transfer for all boxes instead of one per detection
+            data = result.boxes.data.cpu().numpy()
+            predictions.append((data[:, :4], data[:, -2], data[:, -1].astype(int)))
+        return predictions
+
+
+class ExportedYOLOBackend:
+    """YOLO inference on CPU through ONNX Runtime or OpenVINO, with NumPy letterboxing and NMS.
+
+    Takes a model exported with export_yolo_model: an .onnx file for either runtime, or
+    an OpenVINO .xml file. Models exported with dynamic input shapes can run at a smaller
+    size per call; static ones always letterbox to their export size.
+    """
+
+    def __init__(self, model_path, runtime='onnxruntime', intra_threads=0, inter_threads=0, default_imgsz=640):
+        self.runtime = runtime
+        if runtime == 'onnxruntime':
+            if not ONNXRUNTIME_AVAILABLE:
+                raise RuntimeError("onnxruntime not installed")
+            options = onnxruntime.SessionOptions()
+            options.intra_op_num_threads = intra_threads
+            options.inter_op_num_threads = inter_threads
+            self.session = onnxruntime.InferenceSession(model_path, options, providers=['CPUExecutionProvider'])
+            model_input = self.session.get_inputs()[0]
+            self.input_name = model_input.name
+            shape = model_input.shape
+            metadata = self.session.get_modelmeta().custom_metadata_map
+        elif runtime == 'openvino':
+            if not OPENVINO_AVAILABLE:
+                raise RuntimeError("openvino not installed")
+            core = openvino.Core()
+            # OpenVINO has no inter-op pool; its thread count covers all inference threads
+            config = {'INFERENCE_NUM_THREADS': intra_threads} if intra_threads else {}
+            self.compiled = core.compile_model(core.read_model(model_path), 'CPU', config)
+            self.output = self.compiled.output(0)
+            shape = list(self.compiled.input(0).get_partial_shape())
+            shape = [dim.get_length() if dim.is_static else None for dim in shape]
+            metadata = read_openvino_metadata(model_path)
+        else:
+            raise ValueError(f"Unknown runtime: {runtime}")
+
+        self.dynamic = not isinstance(shape[2], int)
+        self.batch_dynamic = not isinstance(shape[0], int)
+        if self.dynamic:
+            # ultralytics records the export size as metadata, e.g. "[512, 512]"; without it, use
+            # the size frames arrive at rather than upscaling them
+            export_size = metadata.get('imgsz', '').strip('[]').split(',')[0]
+            self.imgsz = int(export_size) if export_size else default_imgsz
+        else:
+            self.imgsz = shape[2]
+        self.letterboxed = {}
+        self.blobs = {}
+
+    def get_blob(self, size, batch=1):
+        blob = self.blobs.get((size, batch))
+        if blob is None:
+            blob = self.blobs[size, batch] = np.empty((batch, 3, size, size), dtype=np.float32)
+        return blob
+
+    def infer(self, blob):
+        if self.runtime == 'onnxruntime':
+            return self.session.run(None, {self.input_name: blob})[0]
+        return self.compiled([blob])[self.output]
+
+    def fill_blob(self, img_rgb, size, out):
+        """Letterbox one image into a (3, size, size) blob row; returns the scale and padding"""
+        padded, scale, pad = letterbox(img_rgb, size, out=self.letterboxed.get(size))
+        self.letterboxed[size] = padded
+        # HWC uint8 -> CHW float in [0, 1]
+        np.multiply(padded.transpose(2, 0, 1), np.float32(1 / 255), out=out)
+        return scale, pad
+
+    def prepare(self, img_rgb, imgsz=None):
+        """Letterboxed NCHW input blob, with the scale and padding to map boxes back.
+
+        The blob is a reused buffer, overwritten by the next call at the same size.
+        """
+        size = imgsz if (imgsz and self.dynamic) else self.imgsz
+        blob = self.get_blob(size)
+        scale, pad = self.fill_blob(img_rgb, size, blob[0])
+        return blob, scale, pad
+
+    def predict(self, img_rgb, conf, imgsz=None):
+        """Boxes (xyxy, image pixels), scores and class ids of detections above conf"""
+        blob, scale, (pad_x, pad_y) = self.prepare(img_rgb, imgsz)
+        boxes, scores, classes = decode_yolo_output(self.infer(blob), conf)
+        boxes -= (pad_x, pad_y, pad_x, pad_y)
+        boxes /= scale
+        return boxes, scores, classes
+
+    def predict_batch(self, imgs, conf, imgsz=None):
+        """predict() for several images in one forward pass; needs a model exported with a dynamic batch"""
+        if not self.batch_dynamic:
+            return [self.predict(img, conf, imgsz) for img in imgs]
+        size = imgsz if (imgsz and self.dynamic) else self.imgsz
+        blob = self.get_blob(size, len(imgs))
+        transforms = [self.fill_blob(img, size, blob[i]) for i, img in enumerate(imgs)]
+        output = self.infer(blob)
+
+        predictions = []
+        for i, (scale, (pad_x, pad_y)) in enumerate(transforms):
+            boxes, scores, classes = decode_yolo_output(output[i:i + 1], conf)
+            boxes -= (pad_x, pad_y, pad_x, pad_y)
+            boxes /= scale
+            predictions.append((boxes, scores, classes))
+        return predictions
+
+
+def warmup_model(model, imgsz, runs=2, max_batch=1):
+    """Run a few dummy predictions so lazy initialization is paid at load time, not on the first frame.
+
+    Models that take a dynamic batch are also run at max_batch, the multi-ROI batch in use.
+    """
+    img = np.zeros((imgsz, imgsz, 3), dtype=np.uint8)
+    for _ in range(runs):
+        model.predict(img, 0.5, imgsz)
+        if max_batch > 1 and model.batch_dynamic:
+            model.predict_batch([img] * max_batch, 0.5, imgsz)
+
+
+def read_openvino_metadata(xml_path):
+    """Export metadata ultralytics writes as metadata.yaml next to an OpenVINO .xml, as strings.
+
+    Only the input size is read, in the "[size]" form of the ONNX metadata; {} if it is missing.
+    """
+    path = os.path.join(os.path.dirname(xml_path), 'metadata.yaml')
+    try:
+        with open(path) as f:
+            text = f.read()
+    except OSError:
+        return {}
+    # Either a flow list "imgsz: [512, 512]" or a block list "imgsz:\n- 512\n- 512"
+    match = re.search(r'^imgsz:\s*\[?\s*(?:-\s*)?(\d+)', text, re.MULTILINE)
+    return {'imgsz': f"[{match.group(1)}]"} if match else {}
+
+
+def export_yolo_model(model_path, fmt='onnx', imgsz=640, dynamic=False):
+    """Export a .pt model for CPU inference; returns the path of the exported model.
+
+    A dynamic export accepts any input size, which ROI inference uses to run smaller crops.
+    """
+    if not YOLO_AVAILABLE:
+        raise RuntimeError("ultralytics is needed to export models")
+    exported = YOLO(model_path).export(format=fmt, imgsz=imgsz, dynamic=dynamic)
+    if fmt == 'openvino':
+        # ultralytics writes a <name>_openvino_model directory; the backend loads its .xml
+        xml = [f for f in os.listdir(exported) if f.endswith('.xml')]
+        exported = os.path.join(exported, xml[0])
+    return exported
+
+
+def load_recorded_frames(directory, size, max_frames=300):
+    """Up to max_frames evenly spaced frames from a FrameRecorder directory, as size x size RGB uint8.
+
+    Frames go through the same resize and gray conversion as the ML tracking path.
+    """
+    chunks = sorted(f for f in os.listdir(directory) if f.startswith('chunk_') and f.endswith('.npy'))
+    if not chunks:
+        raise RuntimeError(f"No recorded chunk_*.npy files in {directory}")
+    stacks = [np.load(os.path.join(directory, f), mmap_mode='r') for f in chunks]
+    total = sum(len(stack) for stack in stacks)
+    picks = set(np.linspace(0, total - 1, min(max_frames, total)).astype(int).tolist())
+
+    frames = []
+    n = 0
+    for stack in stacks:
+        for frame in stack:
+            if n in picks:
+                small = cv2.resize(np.asarray(frame), (size, size), interpolation=cv2.INTER_LINEAR)
+                if small.dtype != np.uint8:
+                    small = (small * 255).astype('uint8')
+                if small.ndim == 3:
+                    small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+                frames.append(cv2.cvtColor(small, cv2.COLOR_GRAY2RGB))
+            n += 1
+    return frames
+
+
+def box_iou(a, b):
+    """Pairwise IoU between (N, 4) and (M, 4) xyxy boxes"""
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-9)
+
+
+def compare_yolo_models(reference, candidate, frames, conf=0.5, iou_match=0.5):
+    """Detection drift and speed of candidate against reference on the same frames.
+
+    Boxes are matched greedily by IoU; unmatched reference boxes count against the match rate.
+    """
+    ious, errors, times = [], [], {'reference': 0.0, 'candidate': 0.0}
+    n_reference = n_candidate = 0
+    for model in (reference, candidate):
+        warmup_model(model, frames[0].shape[0])
+    for img in frames:
+        detections = {}
+        for name, model in (('reference', reference), ('candidate', candidate)):
+            start = time.perf_counter()
+            detections[name] = model.predict(img, conf)[0]
+            times[name] += time.perf_counter() - start
+        ref, cand = detections['reference'], detections['candidate']
+        n_reference += len(ref)
+        n_candidate += len(cand)
+        if not len(ref) or not len(cand):
+            continue
+        iou = box_iou(ref, cand)
+        while iou.size and iou.max() >= iou_match:
+            i, j = np.unravel_index(np.argmax(iou), iou.shape)
+            ious.append(iou[i, j])
+            errors.append(np.hypot(*((ref[i, :2] + ref[i, 2:]) / 2 - (cand[j, :2] + cand[j, 2:]) / 2)))
+            iou[i, :] = -1
+            iou[:, j] = -1
+
+    return {
+        'frames': len(frames),
+        'reference_boxes': n_reference,
+        'candidate_boxes': n_candidate,
+        'match_rate': len(ious) / n_reference if n_reference else 1.0,
+        'mean_iou': float(np.mean(ious)) if ious else 0.0,
+        'mean_centroid_error': float(np.mean(errors)) if errors else 0.0,
+        'max_centroid_error': float(np.max(errors)) if errors else 0.0,
+        'reference_ms': times['reference'] * 1000 / len(frames),
+        'candidate_ms': times['candidate'] * 1000 / len(frames),
+        'speedup': times['reference'] / max(times['candidate'], 1e-9),
+    }
+
+
+def quantize_yolo_model(model_path, frames_dir, imgsz=512, output=None, max_frames=300, conf=0.5):
+    """Post-training INT8 quantization of a YOLO model, calibrated on recorded tracking frames.
+
+    A .pt model is exported to ONNX first. Even-numbered frames calibrate the activation
+    ranges, odd-numbered ones measure drift and speed against the FP32 model. The detection
+    head's decoding stays in float, since box coordinates lose too much in 8 bits. Returns
+    the path of the INT8 .onnx model, loadable with either CPU backend, and the comparison
+    report from compare_yolo_models.
+    """
+    if not ONNXRUNTIME_AVAILABLE:
+        raise RuntimeError("onnxruntime is needed to quantize models")
+    import onnx
+    from onnxruntime import quantization
+
+    if model_path.endswith('.pt'):
+        model_path = export_yolo_model(model_path, 'onnx', imgsz, dynamic=True)
+    if not model_path.endswith('.onnx'):
+        raise RuntimeError("Quantization needs a .pt or .onnx model")
+    if output is None:
+        output = os.path.splitext(model_path)[0] + '_int8.onnx'
+
+    frames = load_recorded_frames(frames_dir, imgsz, max_frames)
+    calibration, evaluation = frames[::2], frames[1::2] or frames
+    fp32 = ExportedYOLOBackend(model_path, default_imgsz=imgsz)
+
+    class FrameReader(quantization.CalibrationDataReader):
+        def __init__(self):
+            self.frames = iter(calibration)
+
+        def get_next(self):
+            img = next(self.frames, None)
+            if img is None:
+                return None
+            return {fp32.input_name: fp32.prepare(img, imgsz)[0].copy()}
+
+    model = onnx.load(model_path)
+    # ultralytics names nodes /model.<layer>/...; the last layer is the detection head
+    layers = [int(node.name.split('/')[1].split('.')[1]) for node in model.graph.node
+              if node.name.startswith('/model.') and node.name.split('/')[1].split('.')[1].isdigit()]
+    head = f"/model.{max(layers)}/" if layers else None
+    exclude = [node.name for node in model.graph.node
+               if head and node.name.startswith(head) and (node.op_type != 'Conv' or '/dfl/' in node.name)]
+
+    # Shape inference and graph cleanup first, as onnxruntime recommends; optional if it fails
+    prepared = os.path.splitext(output)[0] + '_prep.onnx'
+    try:
+        quantization.shape_inference.quant_pre_process(model_path, prepared, skip_symbolic_shape=True)
+    except Exception as e:
+        print(f"Quantization pre-processing skipped: {e}")
+        prepared = model_path
+
+    quantization.quantize_static(
+        prepared, output, FrameReader(),
+        quant_format=quantization.QuantFormat.QDQ,
+        activation_type=quantization.QuantType.QUInt8,
+        weight_type=quantization.QuantType.QInt8,
+        per_channel=True,
+        nodes_to_exclude=exclude)
+    if prepared != model_path:
+        os.remove(prepared)
+
+    # Keep the export metadata (input size, class names) for the backend
+    quantized = onnx.load(output)
+    if not quantized.metadata_props:
+        for prop in model.metadata_props:
+            quantized.metadata_props.add(key=prop.key, value=prop.value)
+        onnx.save(quantized, output)
+
+    report = compare_yolo_models(fp32, ExportedYOLOBackend(output, default_imgsz=imgsz), evaluation, conf)
+    return output, report
+
+
+def format_quantization_report(report):
+    return (f"{report['frames']} frames: match rate {report['match_rate']:.1%}, "
+            f"mean IoU {report['mean_iou']:.3f}, centroid error {report['mean_centroid_error']:.2f} px "
+            f"(max {report['max_centroid_error']:.2f}), boxes {report['reference_boxes']} -> "
+            f"{report['candidate_boxes']}; {report['reference_ms']:.1f} ms -> {report['candidate_ms']:.1f} ms "
+            f"per frame ({report['speedup']:.2f}x)")
+
+
+class Mailbox:
+    """Single-slot, latest-value handoff between processes.
+
+    put() overwrites whatever is waiting, so a slow reader always gets the newest value and
+    never works through a backlog. Every put bumps a generation counter: readers pass the
+    last generation they saw, can check for news without taking the lock, and block on a
+    condition variable instead of polling. The generation last taken is recorded, so the
+    writer can tell which value a reader is working on.
+    """
+
+    def __init__(self, context, capacity=65536):
+        self.cond = context.Condition()
+        self.generation = context.Value('q', 0, lock=False)
+        self.taken = context.Value('q', 0, lock=False)
+        self.size = context.Value('i', 0, lock=False)
+        self.data = context.RawArray('B', capacity)
+
+    def put(self, value):
+        """Replace the waiting value and wake readers; returns its generation"""
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(payload) > len(self.data):
+            raise ValueError(f"mailbox payload too large ({len(payload)} bytes)")
+        with self.cond:
+            ctypes.memmove(self.data, payload, len(payload))
+            self.size.value = len(payload)
+            self.generation.value += 1
+            self.cond.notify_all()
+            return self.generation.value
+
+    def has_new(self, seen):
+        """Lock-free check for a value newer than generation seen"""
+        return self.generation.value > seen
+
+    def get(self, seen=0, timeout=None):
+        """Newest value after generation seen, as (value, generation); (None, seen) on timeout"""
+        with self.cond:
+            if not self.cond.wait_for(lambda: self.generation.value > seen, timeout):
+                return None, seen
+            payload = ctypes.string_at(self.data, self.size.value)
+            generation = self.generation.value
+            self.taken.value = generation
+        return pickle.loads(payload), generation
+
+
+def yolo_worker_main(model_path, backend, threads, shm_name, slot_shape, num_slots, warmup_batch,
+                     requests, settings, results):
+    """Inference process: loads and warms up the model, then serves frame slots until it gets None.
+
+    Each slot holds up to slot_shape[0] frames; a request for several is run as one batch.
+    """
+    # Pre- and post-processing here is tiny; leave the cores to the inference runtime and the UI process
+    cv2.setNumThreads(1)
+    shm = shared_memory.SharedMemory(name=shm_name)
+    slots = np.ndarray((num_slots,) + slot_shape, dtype=np.uint8, buffer=shm.buf)
+    try:
+        try:
+            if backend == 'pytorch':
+                model = UltralyticsBackend(model_path, *threads)
+            else:
+                model = ExportedYOLOBackend(model_path, backend, *threads, default_imgsz=slot_shape[1])
+            warmup_model(model, slot_shape[1], max_batch=warmup_batch)
+        except Exception as e:
+            results.put(('error', str(e)))
+            return
+        results.put(('ready', None))
+
+        seen = 0
+        settings_seen = 0
+        params = None
+        while True:
+            request, generation = requests.get(seen, timeout=1.0)
+            if generation == seen:
+                continue
+            seen = generation
+            if request is None:
+                break
+            # Tuning parameters only cross over when they change
+            if settings.has_new(settings_seen):
+                params, settings_seen = settings.get(settings_seen)
+            margin, area_lb, area_ub, confidence, class_ids = params
+
+            slot, count, (h, w), roi, frame_seq, frame_time = request
+            try:
+                if count > 1:
+                    # Several ROIs in one batched call; crops would break the common input size
+                    imgs = [cv2.cvtColor(slots[slot, i, :h, :w], cv2.COLOR_GRAY2RGB) for i in range(count)]
+                    predictions = model.predict_batch(imgs, confidence)
+                    x0, y0, side = 0, 0, w
+                elif roi is not None:
+                    x0, y0, side = roi
+                    img_in = cv2.cvtColor(slots[slot, 0, y0:y0 + side, x0:x0 + side], cv2.COLOR_GRAY2RGB)
+                    predictions = [model.predict(img_in, confidence, side)]
+                else:
+                    x0, y0, side = 0, 0, w
+                    img_in = cv2.cvtColor(slots[slot, 0, :h, :w], cv2.COLOR_GRAY2RGB)
+                    predictions = [model.predict(img_in, confidence)]
+
+                detections = []
+                for boxes, _, classes in predictions:
+                    # Boxes cut by the crop edge fall in its margin band and are rejected like frame-edge ones
+                    _, bboxes, largest_index = filter_detections(
+                        boxes, classes, side, margin, area_lb, area_ub, class_ids, offset=(x0, y0))
+                    detections.append((np.array(bboxes, dtype=np.int32).reshape(-1, 4), largest_index))
+                results.put(('result', (slot, detections, frame_seq, frame_time)))
+            except Exception as e:
+                print(f"YOLO worker error: {e}")
+    finally:
+        # The slot view must go before the mapping can be closed
+        del slots
+        shm.close()
+
+
+class YOLOWorker:
+    """Runs YOLO in a separate process so inference does not compete with the UI for the GIL.
+
+    Frames are copied into one of four preallocated shared-memory slots and announced through
+    a latest-value Mailbox, so a busy worker simply picks up the newest frame when it is done.
+    Detections come back the same way as an (N, 4) bbox array, tagged with the source frame so
+    their age can be measured. If the process dies, it is restarted on the next poll.
+    """
+
+    num_slots = 4  # being inferred, announced, holding an unread result, and being written
+
+    def __init__(self, model_path, backend, frame_shape, threads=(0, 0), max_batch=1, warmup_batch=1):
+        self.model_path = model_path
+        self.backend = backend
+        self.threads = tuple(threads)  # (intra-op, inter-op); 0 leaves the runtime default
+        # Each slot holds a batch of up to max_batch frames
+        self.frame_shape = (max_batch,) + tuple(frame_shape)
+        # Batch size warmed up at load; a larger batch pays its initialization on first use
+        self.warmup_batch = min(warmup_batch, max_batch)
+        # fork is unsafe with Tk and the capture threads running
+        self.context = multiprocessing.get_context('spawn')
+        self.shm = shared_memory.SharedMemory(create=True, size=self.num_slots * int(np.prod(self.frame_shape)))
+        self.slots = np.ndarray((self.num_slots,) + self.frame_shape, dtype=np.uint8, buffer=self.shm.buf)
+        self.process = None
+        self.ready = False
+        self.error = None
+        self.result = None
+        self.settings_value = None
+        self.restarts = 0
+        self.start_time = 0.0
+        self.closed = False
+        # close() can run from the UI thread and the loading thread at once
+        self.close_lock = threading.Lock()
+
+    def start(self):
+        """Spawn the inference process; it loads the model and then reports ready"""
+        # Fresh mailboxes: a killed process may have died holding a lock
+        self.requests = Mailbox(self.context)
+        self.settings = Mailbox(self.context)
+        self.results = Mailbox(self.context)
+        self.results_seen = 0
+        self.posted_slots = {}  # request generation -> slot, from the last one taken on
+        self.ready = False
+        self.result = None
+        if self.settings_value is not None:
+            self.settings.put(self.settings_value)
+        self.process = self.context.Process(
+            target=yolo_worker_main, daemon=True,
+            args=(self.model_path, self.backend, self.threads, self.shm.name, self.frame_shape, self.num_slots,
+                  self.warmup_batch, self.requests, self.settings, self.results))
+        self.process.start()
+        self.start_time = time.time()
+
+    def wait_ready(self, timeout=300.0):
+        """Block until the model is loaded; raises RuntimeError if loading fails"""
+        deadline = time.time() + timeout
+        while not self.results.has_new(self.results_seen):
+            process = self.process
+            if self.closed:
+                raise RuntimeError("YOLO worker was closed while loading")
+            if not process.is_alive():
+                raise RuntimeError(f"YOLO worker exited with code {process.exitcode}")
+            if time.time() > deadline:
+                raise RuntimeError("timed out waiting for the YOLO worker")
+            self.results.get(self.results_seen, timeout=0.5)
+        (kind, payload), self.results_seen = self.results.get(self.results_seen)
+        if self.closed:
+            raise RuntimeError("YOLO worker was closed while loading")
+        if kind == 'error':
+            self.error = payload
+            raise RuntimeError(payload)
+        self.ready = True
+
+    def set_params(self, margin, area_lb, area_ub, confidence, class_ids):
+        """Send filter settings to the worker, only when they changed"""
+        value = (margin, area_lb, area_ub, confidence, class_ids)
+        if value != self.settings_value:
+            self.settings_value = value
+            self.settings.put(value)
+
+    def submit(self, imgs, roi, frame_seq, frame_time):
+        """Copy frames into a free slot and announce them, replacing any request not yet picked up.
+
+        imgs is a list of same-size frames, inferred as one batch; roi applies to a single frame only.
+        """
+        if not self.ready or self.settings_value is None:
+            return False
+        # The worker may be reading the slot it last took and will next take the announced one,
+        # and an unread result still points at its frame. Reading taken before polling means a
+        # result finished after the read is the one for the taken slot, so one of the two covers it
+        taken = self.requests.taken.value
+        self.poll()
+        self.posted_slots = {g: s for g, s in self.posted_slots.items() if g >= taken}
+        busy = (self.posted_slots.get(taken), self.posted_slots.get(self.requests.generation.value),
+                self.result[0] if self.result is not None else None)
+        slot = next(s for s in range(self.num_slots) if s not in busy)
+        imgs = imgs[:self.frame_shape[0]]
+        h, w = imgs[0].shape[:2]
+        for i, img in enumerate(imgs):
+            dst = self.slots[slot, i, :h, :w]
+            if img.dtype == np.uint8:
+                np.copyto(dst, img)
+            else:
+                np.multiply(img, 255, out=dst, casting='unsafe')
+        request = (slot, len(imgs), (h, w), roi if len(imgs) == 1 else None, frame_seq, frame_time)
+        self.posted_slots[self.requests.put(request)] = slot
+        return True
+
+    def poll(self):
+        """Pick up a new reply without blocking; returns True when an unread result is waiting"""
+        if self.process is None:
+            return False
+        if self.results.has_new(self.results_seen):
+            (kind, payload), self.results_seen = self.results.get(self.results_seen)
+            if kind == 'ready':
+                self.ready = True
+            elif kind == 'error':
+                self.error = payload
+                print(f"YOLO worker failed to load the model: {payload}")
+            else:
+                self.result = payload
+
+        # Restart a crashed process, but not one that cannot load its model, and not in a tight loop
+        if not self.process.is_alive() and self.error is None and time.time() - self.start_time > 1.0:
+            print(f"YOLO worker exited with code {self.process.exitcode}, restarting")
+            self.restarts += 1
+            self.start()
+        return self.result is not None
+
+    def take_result(self):
+        """Newest result as (frame, detections, frame_seq, frame_time), or None.
+
+        detections holds one (bboxes, largest_index) pair per submitted frame. frame is the first
+        frame the result was computed on; it stays valid until the next submit. frame_seq and
+        frame_time identify the source frame, for measuring detection age.
+        """
+        if self.result is None:
+            return None
+        slot, detections, frame_seq, frame_time = self.result
+        self.result = None
+        return self.slots[slot, 0], detections, frame_seq, frame_time
+
+    def close(self):
+        """Stop the process and release the shared memory"""
+        self.closed = True
+        with self.close_lock:
+            if self.process is not None:
+                try:
+                    self.requests.put(None)
+                    self.process.join(timeout=2.0)
+                except Exception:
+                    pass
+                if self.process.is_alive():
+                    self.process.terminate()
+                self.process = None
+            self.ready = False
+            self.slots = None
+            # Also called from the UI thread while a load is still waiting, so a second call is a no-op
+            if self.shm is not None:
+                self.shm.close()
+                self.shm.unlink()
+                self.shm = None
+
+
+class TemplateTracker:
+    """Follows one box between detections by template matching.
+
+    The template is cut from the frame the detector ran on and is not updated in between,
+    so the box cannot drift away from what the detector saw. Each update searches a window
+    around the last box with normalized cross-correlation; the peak value is the confidence.
+    """
+
+    def __init__(self, search_pad=0.5):
+        self.search_pad = search_pad  # search margin as a fraction of the box size
+        self.template = None
+        self.bbox = None
+        self.score = 0.0
+
+    def seed(self, img, bbox):
+        x1, y1, x2, y2 = bbox
+        h, w = img.shape[:2]
+        x1, y1, x2, y2 = max(x1, 0), max(y1, 0), min(x2, w), min(y2, h)
+        if x2 - x1 < 4 or y2 - y1 < 4:
+            self.template = None
+            return
+        self.template = img[y1:y2, x1:x2].copy()
+        self.bbox = (x1, y1, x2, y2)
+        self.score = 1.0
+
+    def update(self, img):
+        """Move the box to the best match in img; returns (bbox, score) or (None, 0.0) when lost"""
+        if self.template is None or self.template.dtype != img.dtype:
+            return None, 0.0
+        x1, y1, x2, y2 = self.bbox
+        th, tw = self.template.shape[:2]
+        pad = int(max(tw, th) * self.search_pad) + 4
+        h, w = img.shape[:2]
+        sx0, sy0 = max(x1 - pad, 0), max(y1 - pad, 0)
+        sx1, sy1 = min(x2 + pad, w), min(y2 + pad, h)
+        if sx1 - sx0 < tw or sy1 - sy0 < th:
+            self.score = 0.0
+            return None, 0.0
+
+        response = cv2.matchTemplate(img[sy0:sy1, sx0:sx1], self.template, cv2.TM_CCOEFF_NORMED)
+        _, self.score, _, (mx, my) = cv2.minMaxLoc(response)
+        self.bbox = (sx0 + mx, sy0 + my, sx0 + mx + tw, sy0 + my + th)
+        return self.bbox, self.score
+
+
+class FrameRing:
+    """Fixed-size ring of preallocated frame slots shared by a capture thread and the UI loop.
+
+    The producer writes into a free slot and publishes it with a sequence number and
+    timestamp; the consumer borrows the newest slot without copying and releases it when done.
+    """
+
+    def __init__(self, num_slots, shape, dtype='uint8'):
+        self.slots = [np.zeros(shape, dtype=dtype) for _ in range(num_slots)]
+        self.seqs = [0] * num_slots
+        self.times = [0.0] * num_slots
+        self.borrowed = [0] * num_slots
+        self.lock = threading.Lock()
+        self.latest = None
+        self.write_pos = 0
+        self.seq = 0
+        self.last_read_seq = 0
+        self.dropped = 0
+        self.duplicates = 0
+
+    def acquire_write(self):
+        """Return (index, slot) the producer may overwrite, or (None, None) if every slot is busy"""
+        num_slots = len(self.slots)
+        with self.lock:
+            for k in range(num_slots):
+                i = (self.write_pos + k) % num_slots
+                if i != self.latest and not self.borrowed[i]:
+                    self.write_pos = (i + 1) % num_slots
+                    return i, self.slots[i]
+            self.dropped += 1
+        return None, None
+
+    def publish(self, index, frame, timestamp):
+        """Publish a written slot as the newest frame"""
+        with self.lock:
+            # The source may hand back a new array if the frame size changed
+            self.slots[index] = frame
+            self.seq += 1
+            self.seqs[index] = self.seq
+            self.times[index] = timestamp
+            self.latest = index
+
+    def borrow(self):
+        """Borrow the newest frame as (index, frame, seq, timestamp), or None if nothing was published"""
+        with self.lock:
+            i = self.latest
+            if i is None:
+                return None
+            self.borrowed[i] += 1
+            seq = self.seqs[i]
+            if seq == self.last_read_seq:
+                self.duplicates += 1
+            else:
+                self.dropped += seq - self.last_read_seq - 1
+                self.last_read_seq = seq
+            return i, self.slots[i], seq, self.times[i]
+
+    def release(self, index):
+        """Return a borrowed slot to the producer"""
+        with self.lock:
+            self.borrowed[index] -= 1
+
+
+# V4L2 structures and ioctls (linux/videodev2.h), laid out for the native ABI by ctypes
+class v4l2_capability(ctypes.Structure):
+    _fields_ = [
+        ('driver', ctypes.c_uint8 * 16),
+        ('card', ctypes.c_uint8 * 32),
+        ('bus_info', ctypes.c_uint8 * 32),
+        ('version', ctypes.c_uint32),
+        ('capabilities', ctypes.c_uint32),
+        ('device_caps', ctypes.c_uint32),
+        ('reserved', ctypes.c_uint32 * 3),
+    ]
+
+
+class v4l2_pix_format(ctypes.Structure):
+    _fields_ = [
+        ('width', ctypes.c_uint32),
+        ('height', ctypes.c_uint32),
+        ('pixelformat', ctypes.c_uint32),
+        ('field', ctypes.c_uint32),
+        ('bytesperline', ctypes.c_uint32),
+        ('sizeimage', ctypes.c_uint32),
+        ('colorspace', ctypes.c_uint32),
+        ('priv', ctypes.c_uint32),
+        ('flags', ctypes.c_uint32),
+        ('ycbcr_enc', ctypes.c_uint32),
+        ('quantization', ctypes.c_uint32),
+        ('xfer_func', ctypes.c_uint32),
+    ]
+
+
+class v4l2_format_union(ctypes.Union):
+    # The kernel union contains pointers (struct v4l2_window), hence the pointer member for alignment
+    _fields_ = [
+        ('pix', v4l2_pix_format),
+        ('raw_data', ctypes.c_uint8 * 200),
+        ('_align', ctypes.c_void_p),
+    ]
+
+
+class v4l2_format(ctypes.Structure):
+    _fields_ = [
+        ('type', ctypes.c_uint32),
+        ('fmt', v4l2_format_union),
+    ]
+
+
+class v4l2_requestbuffers(ctypes.Structure):
+    _fields_ = [
+        ('count', ctypes.c_uint32),
+        ('type', ctypes.c_uint32),
+        ('memory', ctypes.c_uint32),
+        ('capabilities', ctypes.c_uint32),
+        ('flags', ctypes.c_uint8),
+        ('reserved', ctypes.c_uint8 * 3),
+    ]
+
+
+class v4l2_timeval(ctypes.Structure):
+    _fields_ = [
+        ('tv_sec', ctypes.c_long),
+        ('tv_usec', ctypes.c_long),
+    ]
+
+
+class v4l2_timecode(ctypes.Structure):
+    _fields_ = [
+        ('type', ctypes.c_uint32),
+        ('flags', ctypes.c_uint32),
+        ('frames', ctypes.c_uint8),
+        ('seconds', ctypes.c_uint8),
+        ('minutes', ctypes.c_uint8),
+        ('hours', ctypes.c_uint8),
+        ('userbits', ctypes.c_uint8 * 4),
+    ]
+
+
+class v4l2_buffer_m(ctypes.Union):
+    _fields_ = [
+        ('offset', ctypes.c_uint32),
+        ('userptr', ctypes.c_ulong),
+        ('planes', ctypes.c_void_p),
+        ('fd', ctypes.c_int32),
+    ]
+
+
+class v4l2_buffer(ctypes.Structure):
+    _fields_ = [
+        ('index', ctypes.c_uint32),
+        ('type', ctypes.c_uint32),
+        ('bytesused', ctypes.c_uint32),
+        ('flags', ctypes.c_uint32),
+        ('field', ctypes.c_uint32),
+        ('timestamp', v4l2_timeval),
+        ('timecode', v4l2_timecode),
+        ('sequence', ctypes.c_uint32),
+        ('memory', ctypes.c_uint32),
+        ('m', v4l2_buffer_m),
+        ('length', ctypes.c_uint32),
+        ('reserved2', ctypes.c_uint32),
+        ('request_fd', ctypes.c_int32),
+    ]
+
+
+def _vidioc(direction, nr, struct_type):
+    return (direction << 30) | (ctypes.sizeof(struct_type) << 16) | (ord('V') << 8) | nr
+
+
+def _fourcc(code):
+    return ord(code[0]) | (ord(code[1]) << 8) | (ord(code[2]) << 16) | (ord(code[3]) << 24)
+
+
+VIDIOC_QUERYCAP = _vidioc(2, 0, v4l2_capability)
+VIDIOC_G_FMT = _vidioc(3, 4, v4l2_format)
+VIDIOC_S_FMT = _vidioc(3, 5, v4l2_format)
+VIDIOC_REQBUFS = _vidioc(3, 8, v4l2_requestbuffers)
+VIDIOC_QUERYBUF = _vidioc(3, 9, v4l2_buffer)
+VIDIOC_QBUF = _vidioc(3, 15, v4l2_buffer)
+VIDIOC_DQBUF = _vidioc(3, 17, v4l2_buffer)
+VIDIOC_STREAMON = _vidioc(1, 18, ctypes.c_int)
+VIDIOC_STREAMOFF = _vidioc(1, 19, ctypes.c_int)
+
+V4L2_BUF_TYPE_VIDEO_CAPTURE = 1
+V4L2_MEMORY_MMAP = 1
+V4L2_FIELD_NONE = 1
+V4L2_CAP_VIDEO_CAPTURE = 0x00000001
+V4L2_CAP_STREAMING = 0x04000000
+V4L2_CAP_DEVICE_CAPS = 0x80000000
+V4L2_PIX_FMT_GREY = _fourcc('GREY')
+V4L2_PIX_FMT_YUYV = _fourcc('YUYV')
+
+
+class V4L2Capture:
+    """Linux V4L2 capture device streaming through memory-mapped driver buffers.
+
+    Negotiates GREY or YUYV and returns the luma plane directly as a single-channel view
+    into the driver buffer, skipping the BGR round-trip. Implements the subset of
+    cv2.VideoCapture used by the capture card thread; a returned frame stays valid until
+    the next read() or grab().
+    """
+
+    def __init__(self, device_index, resolution=None, num_buffers=4):
+        self.fd = os.open(f"/dev/video{device_index}", os.O_RDWR | os.O_NONBLOCK)
+        self.buffers = []
+        self.pending = None
+        try:
+            self._setup(resolution, num_buffers)
+        except Exception:
+            self.release()
+            raise
+
+    def _setup(self, resolution, num_buffers):
+        cap = v4l2_capability()
+        fcntl.ioctl(self.fd, VIDIOC_QUERYCAP, cap)
+        caps = cap.device_caps if cap.capabilities & V4L2_CAP_DEVICE_CAPS else cap.capabilities
+        if not (caps & V4L2_CAP_VIDEO_CAPTURE and caps & V4L2_CAP_STREAMING):
+            raise OSError("device does not support streaming video capture")
+
+        fmt = v4l2_format(type=V4L2_BUF_TYPE_VIDEO_CAPTURE)
+        fcntl.ioctl(self.fd, VIDIOC_G_FMT, fmt)
+        width, height = resolution if resolution else (fmt.fmt.pix.width, fmt.fmt.pix.height)
+
+        # Prefer native grayscale, fall back to YUYV and take its Y plane
+        for pixelformat in (V4L2_PIX_FMT_GREY, V4L2_PIX_FMT_YUYV):
+            fmt = v4l2_format(type=V4L2_BUF_TYPE_VIDEO_CAPTURE)
+            fmt.fmt.pix.width = width
+            fmt.fmt.pix.height = height
+            fmt.fmt.pix.pixelformat = pixelformat
+            fmt.fmt.pix.field = V4L2_FIELD_NONE
+            try:
+                fcntl.ioctl(self.fd, VIDIOC_S_FMT, fmt)
+            except OSError:
+                continue
+            if fmt.fmt.pix.pixelformat == pixelformat:
+                break
+        else:
+            raise OSError("device supports neither GREY nor YUYV")
+
+        self.width = fmt.fmt.pix.width
+        self.height = fmt.fmt.pix.height
+        self.bytesperline = fmt.fmt.pix.bytesperline
+        self.pixelformat = fmt.fmt.pix.pixelformat
+
+        req = v4l2_requestbuffers(count=num_buffers, type=V4L2_BUF_TYPE_VIDEO_CAPTURE, memory=V4L2_MEMORY_MMAP)
+        fcntl.ioctl(self.fd, VIDIOC_REQBUFS, req)
+        if req.count < 2:
+            raise OSError("not enough driver buffers")
+
+        for i in range(req.count):
+            buf = v4l2_buffer(index=i, type=V4L2_BUF_TYPE_VIDEO_CAPTURE, memory=V4L2_MEMORY_MMAP)
+            fcntl.ioctl(self.fd, VIDIOC_QUERYBUF, buf)
+            self.buffers.append(mmap.mmap(self.fd, buf.length, mmap.MAP_SHARED,
+                                          mmap.PROT_READ | mmap.PROT_WRITE, offset=buf.m.offset))
+            fcntl.ioctl(self.fd, VIDIOC_QBUF, buf)
+
+        fcntl.ioctl(self.fd, VIDIOC_STREAMON, ctypes.c_int(V4L2_BUF_TYPE_VIDEO_CAPTURE))
+
+    def isOpened(self):
+        return self.fd is not None
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return self.width
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return self.height
+        return 0
+
+    def set(self, prop, value):
+        # Format and buffer count are negotiated once when the device is opened
+        return False
+
+    def read(self, image=None):
+        """Dequeue the newest filled buffer and return (ret, luma plane view)"""
+        if self.pending is not None:
+            fcntl.ioctl(self.fd, VIDIOC_QBUF, self.pending)
+            self.pending = None
+
+        if not select.select([self.fd], [], [], 1.0)[0]:
+            return False, None
+
+        # Drain every filled buffer, handing older ones straight back, so only the newest is used
+        newest = None
+        while True:
+            buf = v4l2_buffer(type=V4L2_BUF_TYPE_VIDEO_CAPTURE, memory=V4L2_MEMORY_MMAP)
+            try:
+                fcntl.ioctl(self.fd, VIDIOC_DQBUF, buf)
+            except BlockingIOError:
+                break
+            if newest is not None:
+                fcntl.ioctl(self.fd, VIDIOC_QBUF, newest)
+            newest = buf
+
+        if newest is None:
+            return False, None
+
+        self.pending = newest
+        data = np.frombuffer(self.buffers[newest.index], dtype=np.uint8,
+                             count=self.height * self.bytesperline).reshape(self.height, self.bytesperline)
+        if self.pixelformat == V4L2_PIX_FMT_GREY:
+            return True, data[:, :self.width]
+        # YUYV packs Y0 U Y1 V, so luma sits on the even bytes
+        return True, data[:, 0:2 * self.width:2]
+
+    def grab(self):
+        ret, _ = self.read()
+        return ret
+
+    def release(self):
+        if self.fd is None:
+            return
+        try:
+            fcntl.ioctl(self.fd, VIDIOC_STREAMOFF, ctypes.c_int(V4L2_BUF_TYPE_VIDEO_CAPTURE))
+        except OSError:
+            pass
+        for buf in self.buffers:
+            try:
+                buf.close()
+            except BufferError:
+                # A frame view is still alive; the mapping is freed with it
+                pass
+        self.buffers = []
+        self.pending = None
+        os.close(self.fd)
+        self.fd = None
+
+
+# Xlib structures used by the XShm/XDamage screen grabber
+class XImage(ctypes.Structure):
+    # Leading fields only; instances are always allocated by Xlib
+    _fields_ = [
+        ('width', ctypes.c_int),
+        ('height', ctypes.c_int),
+        ('xoffset', ctypes.c_int),
+        ('format', ctypes.c_int),
+        ('data', ctypes.c_void_p),
+        ('byte_order', ctypes.c_int),
+        ('bitmap_unit', ctypes.c_int),
+        ('bitmap_bit_order', ctypes.c_int),
+        ('bitmap_pad', ctypes.c_int),
+        ('depth', ctypes.c_int),
+        ('bytes_per_line', ctypes.c_int),
+        ('bits_per_pixel', ctypes.c_int),
+    ]
+
+
+class XShmSegmentInfo(ctypes.Structure):
+    _fields_ = [
+        ('shmseg', ctypes.c_ulong),
+        ('shmid', ctypes.c_int),
+        ('shmaddr', ctypes.c_void_p),
+        ('readOnly', ctypes.c_int),
+    ]
+
+
+class XRectangle(ctypes.Structure):
+    _fields_ = [
+        ('x', ctypes.c_short),
+        ('y', ctypes.c_short),
+        ('width', ctypes.c_ushort),
+        ('height', ctypes.c_ushort),
+    ]
+
+
+class XDamageNotifyEvent(ctypes.Structure):
+    _fields_ = [
+        ('type', ctypes.c_int),
+        ('serial', ctypes.c_ulong),
+        ('send_event', ctypes.c_int),
+        ('display', ctypes.c_void_p),
+        ('drawable', ctypes.c_ulong),
+        ('damage', ctypes.c_ulong),
+        ('level', ctypes.c_int),
+        ('more', ctypes.c_int),
+        ('timestamp', ctypes.c_ulong),
+        ('area', XRectangle),
+        ('geometry', XRectangle),
+    ]
+
+
+class XEvent(ctypes.Union):
+    _fields_ = [
+        ('type', ctypes.c_int),
+        ('damage', XDamageNotifyEvent),
+        ('pad', ctypes.c_long * 24),
+    ]
+
+
+class XShmDamageGrabber:
+    """Linux screen grabber that only captures when the watched rectangle was redrawn.
+
+    Frames are read with XShmGetImage into a SysV shared-memory XImage, and a DAMAGE
+    object on the root window reports which rectangles changed. Must be created and
+    used from a single thread, since it owns its own X connection.
+    """
+
+    ZPixmap = 2
+    XDamageReportRawRectangles = 0
+    IPC_PRIVATE = 0
+    IPC_CREAT = 0o1000
+    IPC_RMID = 0
+
+    def __init__(self):
+        self.x11 = ctypes.CDLL(ctypes.util.find_library('X11'))
+        self.xext = ctypes.CDLL(ctypes.util.find_library('Xext'))
+        self.xdamage = ctypes.CDLL(ctypes.util.find_library('Xdamage'))
+        self.libc = ctypes.CDLL(None, use_errno=True)
+        self._declare_functions()
+
+        self.display = self.x11.XOpenDisplay(None)
+        if not self.display:
+            raise OSError("cannot open X display")
+        self.image = None
+        self.shminfo = None
+        self.damage = None
+
+        try:
+            if not self.xext.XShmQueryExtension(self.display):
+                raise OSError("X server lacks the MIT-SHM extension")
+            event_base, error_base = ctypes.c_int(), ctypes.c_int()
+            if not self.xdamage.XDamageQueryExtension(self.display, ctypes.byref(event_base),
+                                                      ctypes.byref(error_base)):
+                raise OSError("X server lacks the DAMAGE extension")
+            major, minor = ctypes.c_int(1), ctypes.c_int(1)
+            self.xdamage.XDamageQueryVersion(self.display, ctypes.byref(major), ctypes.byref(minor))
+            self.damage_event = event_base.value  # XDamageNotify is event 0 of the extension
+
+            screen = self.x11.XDefaultScreen(self.display)
+            self.root = self.x11.XDefaultRootWindow(self.display)
+            self.visual = self.x11.XDefaultVisual(self.display, screen)
+            self.depth = self.x11.XDefaultDepth(self.display, screen)
+            self.damage = self.xdamage.XDamageCreate(self.display, self.root, self.XDamageReportRawRectangles)
+            self.x11.XSync(self.display, 0)
+        except Exception:
+            self.close()
+            raise
+
+    def _declare_functions(self):
+        x11, xext, xdamage, libc = self.x11, self.xext, self.xdamage, self.libc
+        x11.XOpenDisplay.restype = ctypes.c_void_p
+        x11.XOpenDisplay.argtypes = [ctypes.c_char_p]
+        x11.XCloseDisplay.argtypes = [ctypes.c_void_p]
+        x11.XDefaultScreen.argtypes = [ctypes.c_void_p]
+        x11.XDefaultRootWindow.restype = ctypes.c_ulong
+        x11.XDefaultRootWindow.argtypes = [ctypes.c_void_p]
+        x11.XDefaultVisual.restype = ctypes.c_void_p
+        x11.XDefaultVisual.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        x11.XDefaultDepth.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        x11.XConnectionNumber.argtypes = [ctypes.c_void_p]
+        x11.XPending.argtypes = [ctypes.c_void_p]
+        x11.XNextEvent.argtypes = [ctypes.c_void_p, ctypes.POINTER(XEvent)]
+        x11.XSync.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        x11.XFree.argtypes = [ctypes.c_void_p]
+        xext.XShmQueryExtension.argtypes = [ctypes.c_void_p]
+        xext.XShmCreateImage.restype = ctypes.POINTER(XImage)
+        xext.XShmCreateImage.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_uint, ctypes.c_int,
+                                         ctypes.c_void_p, ctypes.POINTER(XShmSegmentInfo),
+                                         ctypes.c_uint, ctypes.c_uint]
+        xext.XShmAttach.argtypes = [ctypes.c_void_p, ctypes.POINTER(XShmSegmentInfo)]
+        xext.XShmDetach.argtypes = [ctypes.c_void_p, ctypes.POINTER(XShmSegmentInfo)]
+        xext.XShmGetImage.argtypes = [ctypes.c_void_p, ctypes.c_ulong, ctypes.POINTER(XImage),
+                                      ctypes.c_int, ctypes.c_int, ctypes.c_ulong]
+        xdamage.XDamageQueryExtension.argtypes = [ctypes.c_void_p, ctypes.POINTER(ctypes.c_int),
+                                                  ctypes.POINTER(ctypes.c_int)]
+        xdamage.XDamageQueryVersion.argtypes = [ctypes.c_void_p, ctypes.POINTER(ctypes.c_int),
+                                                ctypes.POINTER(ctypes.c_int)]
+        xdamage.XDamageCreate.restype = ctypes.c_ulong
+        xdamage.XDamageCreate.argtypes = [ctypes.c_void_p, ctypes.c_ulong, ctypes.c_int]
+        xdamage.XDamageDestroy.argtypes = [ctypes.c_void_p, ctypes.c_ulong]
+        libc.shmget.argtypes = [ctypes.c_int, ctypes.c_size_t, ctypes.c_int]
+        libc.shmat.restype = ctypes.c_void_p
+        libc.shmat.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.c_int]
+        libc.shmdt.argtypes = [ctypes.c_void_p]
+        libc.shmctl.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_void_p]
+
+    def _create_image(self, width, height):
+        self._destroy_image()
+        shminfo = XShmSegmentInfo()
+        image = self.xext.XShmCreateImage(self.display, self.visual, self.depth, self.ZPixmap,
+                                          None, ctypes.byref(shminfo), width, height)
+        if not image:
+            raise OSError("XShmCreateImage failed")
+        if image.contents.bits_per_pixel != 32:
+            self.x11.XFree(image)
+            raise OSError("XShm capture needs a 24/32-bit TrueColor display")
+
+        size = image.contents.bytes_per_line * height
+        shminfo.shmid = self.libc.shmget(self.IPC_PRIVATE, size, self.IPC_CREAT | 0o600)
+        if shminfo.shmid < 0:
+            self.x11.XFree(image)
+            raise OSError(ctypes.get_errno(), "shmget failed")
+        shmaddr = self.libc.shmat(shminfo.shmid, None, 0)
+        # shmat reports failure as (void *)-1, not NULL
+        if shmaddr is None or shmaddr == ctypes.c_void_p(-1).value:
+            errno = ctypes.get_errno()
+            self.libc.shmctl(shminfo.shmid, self.IPC_RMID, None)
+            self.x11.XFree(image)
+            raise OSError(errno, "shmat failed")
+        shminfo.shmaddr = shmaddr
+        shminfo.readOnly = 0
+        image.contents.data = shminfo.shmaddr
+        self.xext.XShmAttach(self.display, ctypes.byref(shminfo))
+        self.x11.XSync(self.display, 0)
+        # Mark for removal now; the segment lives until both sides detach
+        self.libc.shmctl(shminfo.shmid, self.IPC_RMID, None)
+
+        self.image = image
+        self.shminfo = shminfo
+        buf = (ctypes.c_uint8 * size).from_address(shminfo.shmaddr)
+        self.pixels = np.ctypeslib.as_array(buf).reshape(height, image.contents.bytes_per_line)
+
+    def _destroy_image(self):
+        if self.image is None:
+            return
+        self.xext.XShmDetach(self.display, ctypes.byref(self.shminfo))
+        self.x11.XSync(self.display, 0)
+        self.libc.shmdt(ctypes.c_void_p(self.shminfo.shmaddr))
+        self.x11.XFree(self.image)
+        self.image = None
+        self.shminfo = None
+        self.pixels = None
+
+    def wait_for_damage(self, monitor, timeout):
+        """Wait up to timeout seconds and return True if any damage intersected the monitor rectangle"""
+        fd = self.x11.XConnectionNumber(self.display)
+        if not self.x11.XPending(self.display):
+            select.select([fd], [], [], timeout)
+
+        left, top = monitor['left'], monitor['top']
+        right, bottom = left + monitor['width'], top + monitor['height']
+        damaged = False
+        event = XEvent()
+        # Drain every queued event so damage does not pile up between grabs
+        while self.x11.XPending(self.display):
+            self.x11.XNextEvent(self.display, ctypes.byref(event))
+            if event.type != self.damage_event:
+                continue
+            area = event.damage.area
+            if area.x < right and area.x + area.width > left and area.y < bottom and area.y + area.height > top:
+                damaged = True
+        return damaged
+
+    def grab(self, monitor):
+        """Grab the monitor rectangle as a BGRA array"""
+        width, height = monitor['width'], monitor['height']
+        if self.image is None or self.image.contents.width != width or self.image.contents.height != height:
+            self._create_image(width, height)
+        if not self.xext.XShmGetImage(self.display, self.root, self.image, monitor['left'], monitor['top'],
+                                      0xFFFFFFFF):
+            raise OSError("XShmGetImage failed")
+        # Copy out of the shared segment, which the next grab overwrites
+        return self.pixels[:, :width * 4].reshape(height, width, 4).copy()
+
+    def close(self):
+        if self.display is None:
+            return
+        self._destroy_image()
+        if self.damage:
+            self.xdamage.XDamageDestroy(self.display, self.damage)
+            self.damage = None
+        self.x11.XCloseDisplay(self.display)
+        self.display = None
+
+
+class ReplaySource:
+    """Recorded frames for offline runs: a video file, a TIFF stack or a .npy frame cube.
+
+    .npy cubes are memory-mapped and TIFF stacks are memory-mapped or read page by page
+    when tifffile is available, so long recordings are not loaded into RAM. Frames are
+    returned as uint8 gray or BGR, like the live capture sources.
+    """
+
+    def __init__(self, path, default_fps=30.0):
+        self.path = path
+        self.cap = None
+        self.frames = None
+        self.pages = None
+        self.tiff = None
+        self.fps = default_fps
+        ext = os.path.splitext(path)[1].lower()
+
+        if ext == '.npy':
+            self.frames = np.load(path, mmap_mode='r')
+        elif ext in ('.tif', '.tiff'):
+            if TIFFFILE_AVAILABLE:
+                try:
+                    self.frames = tifffile.memmap(path, mode='r')
+                except Exception:
+                    # Compressed or non-contiguous stacks are decoded page by page
+                    self.tiff = tifffile.TiffFile(path)
+                    self.pages = self.tiff.pages
+            else:
+                ok, frames = cv2.imreadmulti(path, flags=cv2.IMREAD_UNCHANGED)
+                if not ok:
+                    raise OSError(f"cannot read TIFF stack {path}")
+                self.frames = frames
+        else:
+            self.cap = cv2.VideoCapture(path)
+            if not self.cap.isOpened():
+                raise OSError(f"cannot open video {path}")
+            fps = self.cap.get(cv2.CAP_PROP_FPS)
+            if fps > 0:
+                self.fps = fps
+            self.next_index = 0
+
+        if self.frames is not None and getattr(self.frames, 'ndim', 3) == 2:
+            # A single 2D image is a one-frame stack
+            self.frames = self.frames[np.newaxis]
+
+        if self.cap is not None:
+            self.frame_count = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        elif self.pages is not None:
+            self.frame_count = len(self.pages)
+        else:
+            self.frame_count = len(self.frames)
+
+    def read(self, index):
+        """Return frame index as uint8 gray or BGR, or None past the end"""
+        if self.cap is not None:
+            if index != self.next_index:
+                skip = index - self.next_index
+                if 0 < skip <= 8:
+                    # Short forward jumps are cheaper to decode through than to seek
+                    for _ in range(skip):
+                        self.cap.grab()
+                else:
+                    self.cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+            ret, frame = self.cap.read()
+            self.next_index = index + 1
+            return self.drop_alpha(frame) if ret else None
+
+        if index >= self.frame_count:
+            return None
+        frame = self.pages[index].asarray() if self.pages is not None else np.asarray(self.frames[index])
+        return self.drop_alpha(self.to_uint8(frame))
+
+    @staticmethod
+    def drop_alpha(frame):
+        """BGR from a 4-channel frame; the capture pipeline takes gray or BGR only"""
+        if frame.ndim == 3 and frame.shape[2] == 4:
+            return cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
+        return frame
+
+    @staticmethod
+    def to_uint8(frame):
+        """Scale a recorded frame to uint8 by dtype range (float frames are taken as 0-1)"""
+        if frame.dtype == np.uint8:
+            return frame
+        if frame.dtype == np.uint16:
+            return cv2.convertScaleAbs(frame, alpha=1 / 257)
+        return cv2.convertScaleAbs(frame, alpha=255)
+
+    def release(self):
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+        if self.tiff is not None:
+            self.tiff.close()
+            self.tiff = None
+        self.frames = None
+        self.pages = None
+
+
+class FrameRecorder:
+    """Writes processed frames to disk on a background thread during a tilt series.
+
+    Frames pass through a bounded queue, so a stalled disk never slows down tracking:
+    when the queue is full the frame is dropped and counted instead. Frames are stored
+    as .npy chunks (which the replay source can open directly) next to a frames.csv
+    index holding each frame's chunk, tilt index, angle and timestamp.
+    """
+
+    def __init__(self, directory, every_n=1, queue_size=64, chunk_frames=256):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.every_n = max(1, every_n)
+        self.chunk_frames = chunk_frames
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.offered = 0
+        self.written = 0
+        self.dropped = 0
+        self.running = True
+        self.thread = threading.Thread(target=self.writer_loop, daemon=True)
+        self.thread.start()
+
+    def submit(self, frame, tilt_index, angle, timestamp):
+        """Queue every Nth frame for writing without blocking; returns False if the frame was dropped"""
+        self.offered += 1
+        if (self.offered - 1) % self.every_n:
+            return True
+        try:
+            # Copy, since capture buffers are reused on the next tick
+            self.queue.put_nowait((frame.copy(), tilt_index, angle, timestamp))
+        except queue.Full:
+            self.dropped += 1
+            return False
+        return True
+
+    def writer_loop(self):
+        """Background thread draining the queue into .npy chunks"""
+        chunk = None
+        chunk_no = 0
+        n = 0
+        with open(os.path.join(self.directory, "frames.csv"), 'w') as index_file:
+            index_file.write("frame,chunk,slot,tilt_index,angle,timestamp\n")
+            while self.running or not self.queue.empty():
+                try:
+                    frame, tilt_index, angle, timestamp = self.queue.get(timeout=0.2)
+                except queue.Empty:
+                    continue
+
+                try:
+                    # Start a new chunk when the current one is full or the ROI size changed
+                    if chunk is not None and (n == len(chunk) or chunk.shape[1:] != frame.shape):
+                        self.save_chunk(chunk_no, chunk[:n])
+                        index_file.flush()
+                        chunk = None
+                        chunk_no += 1
+                    if chunk is None:
+                        chunk = np.empty((self.chunk_frames,) + frame.shape, dtype=frame.dtype)
+                        n = 0
+
+                    chunk[n] = frame
+                    index_file.write(f"{self.written},{chunk_no},{n},{tilt_index},{angle:.2f},{timestamp:.6f}\n")
+                    n += 1
+                    self.written += 1
+                except Exception as e:
+                    print(f"Recorder error: {e}")
+
+            if chunk is not None and n:
+                self.save_chunk(chunk_no, chunk[:n])
+
+    def save_chunk(self, chunk_no, frames):
+        np.save(os.path.join(self.directory, f"chunk_{chunk_no:05d}.npy"), frames)
+
+    def close(self, wait=False):
+        """Stop accepting frames; the writer flushes what is queued before exiting"""
+        self.running = False
+        if wait:
+            self.thread.join(timeout=10.0)
+
+
 class ScreenGrabberApp:
     def __init__(self, root):
         self.root = root
@@ -96,21 +1917,93 @@ class ScreenGrabberApp:
         self.delay = 2
         self.transThres = 25
 
-        # Capture source: 'mss' or 'capture_card'
+        # Capture source: 'mss', 'xshm', 'capture_card', 'v4l2' or 'replay'
         self.capture_source = tk.StringVar(value='mss')
         self.capture_device_index = tk.IntVar(value=0)
         self.capture_resolution = tk.StringVar(value="")
         self.available_devices = []
         self.available_resolutions = []
+        self.device_cache = {}
+        self.device_scan_running = False
+        self.device_scan_callbacks = []
         self.capture_card = None
-        self.capture_card_latest_frame = None
-        self.capture_card_lock = threading.Lock()
+        self.capture_card_ring = None
+        self.capture_card_ring_slots = 4
+        self.capture_card_size = None
+        self.capture_card_roi = None
         self.capture_card_running = False
         self.capture_card_thread = None
 
+        # Replay of recorded frames: 'realtime', 'fast' (every frame, no waiting) or 'step'
+        self.replay_path = tk.StringVar(value="No file selected")
+        self.replay_pacing = tk.StringVar(value='realtime')
+        self.replay_loop = tk.BooleanVar(value=True)
+        self.replay_source = None
+        self.replay_frame = None
+        self.replay_index = -1
+        self.replay_seq = 0
+        self.replay_clock = (time.time(), 0)
+        self.replay_step_requested = False
+
+        # Optional raw-frame recorder for tilt series
+        self.record_frames = tk.BooleanVar(value=False)
+        self.record_every_n = 1
+        self.recorder = None
+
+        # Screen-grab producer thread (MSS or XShm) publishing the newest screen grab
+        self.mss_monitor = None
+        self.mss_latest_frame = None
+        self.mss_frame_seq = 0
+        self.mss_frame_time = None
+        self.mss_lock = threading.Lock()
+        self.mss_running = False
+        self.mss_thread = None
+        self.mss_max_fps = 100
+
         # Tracking method: 'classical' or 'ml'
         self.tracking_method = tk.StringVar(value='classical')
 
+        # 8-bit pipeline: keep frames as single-channel uint8 from capture to display
+        self.uint8_pipeline = tk.BooleanVar(value=True)
+        self.buffers = {}
+
+        # Use the constant-time box approximation for large blur kernels
+        self.fast_blur = tk.BooleanVar(value=True)
+        # Smallest kernels where the box approximation beats GaussianBlur (see --benchmark-blur)
+        self.fast_blur_min_kernel = {'uint8': 15, 'float32': 51}
+
+        # Phase-correlation drift tracking against a reference frame
+        self.phase = PhaseCorrelator()
+        self.phase_min_response = 0.05  # below this the correlation peak is treated as lost
+        self.phase_reference_requested = True
+        self.phase_key = None
+
+        # Kalman tracks keep the selected target locked and predict it to the time of correction
+        self.target_lock = tk.BooleanVar(value=True)
+        self.tracker = KalmanTracker()
+        self.tracker_key = None
+
+        # Multi-ROI: several regions of the captured frame per tick. ROI 1 goes through the normal
+        # pipeline and drives the stage; the others are detected together in one batched pass
+        self.multi_roi = tk.BooleanVar(value=False)
+        self.multi_roi_spec = tk.StringVar(value="2x1")
+        self.multi_roi_max = 8
+        self.multi_roi_frames = None  # (n, img_size, img_size) stack of the extra regions
+        self.multi_roi_results = []  # (centroids, bboxes, largest_index) per extra region
+        self.multi_roi_error = None
+
+        # Search only a window around the predicted target position (classical tracking)
+        self.window_search = tk.BooleanVar(value=False)
+        self.search_window_min = 32  # half-size in processing pixels
+        self.search_state = None  # (predicted cx, predicted cy, half-size) or None for full frame
+        self.search_last_pos = None
+        self.search_window_active = None
+
+        # Skip segmentation and rendering of frames that match the last processed one
+        self.skip_unchanged = tk.BooleanVar(value=True)
+        self.dedup_size = 64
+        self.dedup_tolerance = 0.0  # mean absolute thumbnail difference, in gray levels
+
         # Slider variables
         self.x_var = tk.IntVar(value=0)
         self.y_var = tk.IntVar(value=0)
@@ -125,23 +2018,51 @@ class ScreenGrabberApp:
         self.area_ub_var = tk.IntVar(value=90000)
         self.confidence_var = tk.DoubleVar(value=0.5)
 
-        # YOLO model
-        self.yolo_model = None
+        # YOLO model, served by an inference process once loaded
+        self.yolo_worker = None
+        self.yolo_loading_worker = None  # still loading its model, until handed over to yolo_worker
         self.yolo_model_path = tk.StringVar(value="No model selected")
         self.yolo_model_loaded = False
+        # Inference backend: 'pytorch' (ultralytics), or 'onnxruntime' / 'openvino' for exported models
+        self.yolo_backend = tk.StringVar(value='pytorch')
+        # Inference threads, applied on load. By default inference leaves two cores to capture,
+        # OpenCV and the UI; 0 leaves the choice to the runtime
+        self.yolo_intra_threads = tk.StringVar(value=str(max(1, (os.cpu_count() or 4) - 2)))
+        self.yolo_inter_threads = tk.StringVar(value="1")
+        # Load the last-used model in the background at startup
+        self.yolo_preload = tk.BooleanVar(value=True)
+        # ROI inference: after a hit, run YOLO on a crop around the target at a smaller input size
+        self.yolo_roi = tk.BooleanVar(value=False)
+        self.yolo_roi_scale = 3  # crop side in multiples of the target's larger bbox side
+        self.yolo_roi_min = 128
+        self.yolo_roi_full_every = 10  # every Nth inference still scans the full frame
+        self.yolo_roi_count = 0
+        self.yolo_roi_lost = True
+
+        # Detect-then-track cascade: YOLO seeds a template tracker that updates every frame
+        self.yolo_cascade = tk.BooleanVar(value=False)
+        self.yolo_cascade_every = 15  # frames between scheduled re-detections
+        self.yolo_cascade_min_score = 0.6  # template match below this triggers a re-detection
+        self.cascade_tracker = TemplateTracker()
+        self.cascade_frames = 0
+        self.cascade_submit_time = None
+
+        # Comma-separated class ids to keep; blank keeps every class
+        self.yolo_classes = tk.StringVar(value="")
+        self.yolo_class_ids = None
         
-        # YOLO threading
-        self.yolo_input_queue = queue.Queue(maxsize=2)
-        self.yolo_output_queue = queue.Queue(maxsize=2)
-        self.yolo_thread = None
-        self.yolo_running = False
+        # YOLO inference rate, and how old the source frame of the latest detection was
         self.yolo_fps = 0
+        self.yolo_latency_ms = 0.0
+        self.yolo_latency_frames = 0
+        self.yolo_source_time = None  # capture time of the frame the newest result was computed on
         self.yolo_last_time = time.time()
         self.yolo_frame_count = 0
         self.latest_yolo_result = None
 
-        # Load config before building UI
+        # Load config and cached capture devices before building UI
         self.load_config()
+        self.load_device_cache()
 
         # Build UI
         self.build_ui()
@@ -155,9 +2076,23 @@ class ScreenGrabberApp:
         self.sct = mss.mss()
         self.last_time = time.time()
         self.frame_count = 0
+        self.frame_seq = 0
+        self.frame_time = None
+
+        # Last processed frame, settings and result, so unchanged frames are not reprocessed
+        self.processed_frame_key = None
+        self.processed_params = None
+        self.processed_result = ([], [], None, [])
+
+        if self.capture_source.get() in SCREEN_SOURCES:
+            self.start_mss_capture()
 
-        # Scan for available capture devices
-        self.scan_capture_devices()
+        # Revalidate cached capture devices in the background
+        self.scan_capture_devices_async()
+
+        # Load and warm up the last-used model now, so switching to ML later does not stall
+        if self.yolo_preload.get() and os.path.exists(self.yolo_model_path.get()):
+            self.load_yolo_model()
 
         self.update_status_circle()
         self.update_tracking_status_label()
@@ -174,6 +2109,25 @@ class ScreenGrabberApp:
                 print(f"Error loading config: {e}")
                 self.config = {}
 
+    def load_device_cache(self):
+        """Load cached capture devices and resolutions so they show up before a scan finishes"""
+        self.device_cache = {'devices': [], 'resolutions': {}}
+        if os.path.exists(DEVICE_CACHE_FILE):
+            try:
+                with open(DEVICE_CACHE_FILE, 'r') as f:
+                    self.device_cache.update(json.load(f))
+            except Exception as e:
+                print(f"Error loading device cache: {e}")
+        self.available_devices = self.device_cache['devices']
+
+    def save_device_cache(self):
+        """Save discovered capture devices and resolutions to JSON file"""
+        try:
+            with open(DEVICE_CACHE_FILE, 'w') as f:
+                json.dump(self.device_cache, f, indent=2)
+        except Exception as e:
+            print(f"Error saving device cache: {e}")
+
     def save_config(self, *args):
         """Save current configuration to JSON file"""
         config = {
@@ -181,6 +2135,9 @@ class ScreenGrabberApp:
             'capture_source': self.capture_source.get(),
             'capture_device_index': self.capture_device_index.get(),
             'capture_resolution': self.capture_resolution.get(),
+            'replay_path': self.replay_path.get(),
+            'replay_pacing': self.replay_pacing.get(),
+            'replay_loop': self.replay_loop.get(),
             
             # Screen capture
             'x': self.x_var.get(),
@@ -192,6 +2149,13 @@ class ScreenGrabberApp:
             
             # Tracking
             'tracking_method': self.tracking_method.get(),
+            'uint8_pipeline': self.uint8_pipeline.get(),
+            'skip_unchanged': self.skip_unchanged.get(),
+            'fast_blur': self.fast_blur.get(),
+            'window_search': self.window_search.get(),
+            'target_lock': self.target_lock.get(),
+            'multi_roi': self.multi_roi.get(),
+            'multi_roi_spec': self.multi_roi_spec.get(),
             'blur': self.blur_var.get(),
             'thresh': self.thresh_var.get(),
             'margin': self.margin_var.get(),
@@ -199,6 +2163,13 @@ class ScreenGrabberApp:
             'area_ub': self.area_ub_var.get(),
             'confidence': self.confidence_var.get(),
             'yolo_model_path': self.yolo_model_path.get(),
+            'yolo_backend': self.yolo_backend.get(),
+            'yolo_classes': self.yolo_classes.get(),
+            'yolo_roi': self.yolo_roi.get(),
+            'yolo_cascade': self.yolo_cascade.get(),
+            'yolo_intra_threads': self.yolo_intra_threads.get(),
+            'yolo_inter_threads': self.yolo_inter_threads.get(),
+            'yolo_preload': self.yolo_preload.get(),
             
             # Configuration text entries
             'microscopy_ip': self.text_entries.get("Microscopy IP", ttk.Entry()).get() if hasattr(self, 'text_entries') else "192.168.0.1",
@@ -213,6 +2184,8 @@ class ScreenGrabberApp:
             
             # Control states
             'tracking_enabled': self.tracking.get(),
+            'record_frames': self.record_frames.get(),
+            'record_every_n': self.text_entries["Record every N"].get() if "Record every N" in getattr(self, 'text_entries', {}) else str(self.record_every_n),
         }
         
         try:
@@ -233,6 +2206,12 @@ class ScreenGrabberApp:
             self.capture_device_index.set(self.config['capture_device_index'])
         if 'capture_resolution' in self.config:
             self.capture_resolution.set(self.config['capture_resolution'])
+        if 'replay_path' in self.config:
+            self.replay_path.set(self.config['replay_path'])
+        if 'replay_pacing' in self.config:
+            self.replay_pacing.set(self.config['replay_pacing'])
+        if 'replay_loop' in self.config:
+            self.replay_loop.set(self.config['replay_loop'])
             
         # Apply slider values
         if 'x' in self.config:
@@ -261,10 +2240,41 @@ class ScreenGrabberApp:
             self.confidence_var.set(self.config['confidence'])
         if 'yolo_model_path' in self.config:
             self.yolo_model_path.set(self.config['yolo_model_path'])
+        if self.config.get('yolo_backend') in YOLO_BACKENDS:
+            self.yolo_backend.set(self.config['yolo_backend'])
+        if 'yolo_classes' in self.config:
+            self.yolo_classes.set(self.config['yolo_classes'])
+            self.on_yolo_classes_change()
+        if 'yolo_roi' in self.config:
+            self.yolo_roi.set(self.config['yolo_roi'])
+        if 'yolo_cascade' in self.config:
+            self.yolo_cascade.set(self.config['yolo_cascade'])
+        if 'yolo_intra_threads' in self.config:
+            self.yolo_intra_threads.set(self.config['yolo_intra_threads'])
+        if 'yolo_inter_threads' in self.config:
+            self.yolo_inter_threads.set(self.config['yolo_inter_threads'])
+        if 'yolo_preload' in self.config:
+            self.yolo_preload.set(self.config['yolo_preload'])
         if 'tracking_method' in self.config:
             self.tracking_method.set(self.config['tracking_method'])
+        if 'uint8_pipeline' in self.config:
+            self.uint8_pipeline.set(self.config['uint8_pipeline'])
+        if 'fast_blur' in self.config:
+            self.fast_blur.set(self.config['fast_blur'])
+        if 'window_search' in self.config:
+            self.window_search.set(self.config['window_search'])
+        if 'target_lock' in self.config:
+            self.target_lock.set(self.config['target_lock'])
+        if 'multi_roi' in self.config:
+            self.multi_roi.set(self.config['multi_roi'])
+        if 'multi_roi_spec' in self.config:
+            self.multi_roi_spec.set(self.config['multi_roi_spec'])
+        if 'skip_unchanged' in self.config:
+            self.skip_unchanged.set(self.config['skip_unchanged'])
         if 'tracking_enabled' in self.config:
             self.tracking.set(self.config['tracking_enabled'])
+        if 'record_frames' in self.config:
+            self.record_frames.set(self.config['record_frames'])
             
         # Apply text entry values
         if hasattr(self, 'text_entries'):
@@ -286,6 +2296,8 @@ class ScreenGrabberApp:
                 self.set_entry_value("Trans threshold (px)", self.config['trans_threshold'])
             if 'multiplier' in self.config:
                 self.set_entry_value("Multiplier", self.config['multiplier'])
+            if 'record_every_n' in self.config:
+                self.set_entry_value("Record every N", self.config['record_every_n'])
 
         # Update UI state
         self.toggle_height_slider()
@@ -331,6 +2343,9 @@ class ScreenGrabberApp:
         self.capture_source.trace_add('write', self.save_config)
         self.capture_device_index.trace_add('write', self.save_config)
         self.capture_resolution.trace_add('write', self.save_config)
+        self.replay_path.trace_add('write', self.save_config)
+        self.replay_pacing.trace_add('write', self.save_config)
+        self.replay_loop.trace_add('write', self.save_config)
         
         # Bind slider variables
         self.x_var.trace_add('write', self.save_config)
@@ -346,8 +2361,24 @@ class ScreenGrabberApp:
         self.area_ub_var.trace_add('write', self.save_config)
         self.confidence_var.trace_add('write', self.save_config)
         self.yolo_model_path.trace_add('write', self.save_config)
+        self.yolo_backend.trace_add('write', self.save_config)
+        self.yolo_classes.trace_add('write', self.save_config)
+        self.yolo_classes.trace_add('write', self.on_yolo_classes_change)
+        self.yolo_roi.trace_add('write', self.save_config)
+        self.yolo_cascade.trace_add('write', self.save_config)
+        self.yolo_intra_threads.trace_add('write', self.save_config)
+        self.yolo_inter_threads.trace_add('write', self.save_config)
+        self.yolo_preload.trace_add('write', self.save_config)
         self.tracking_method.trace_add('write', self.save_config)
+        self.uint8_pipeline.trace_add('write', self.save_config)
+        self.fast_blur.trace_add('write', self.save_config)
+        self.window_search.trace_add('write', self.save_config)
+        self.target_lock.trace_add('write', self.save_config)
+        self.multi_roi.trace_add('write', self.save_config)
+        self.multi_roi_spec.trace_add('write', self.save_config)
+        self.skip_unchanged.trace_add('write', self.save_config)
         self.tracking.trace_add('write', self.save_config)
+        self.record_frames.trace_add('write', self.save_config)
 
         # Bind text entry changes
         for name, entry in self.text_entries.items():
@@ -401,39 +2432,98 @@ class ScreenGrabberApp:
         supported.sort(key=lambda x: x[0] * x[1], reverse=True)
         return supported
 
-    def scan_capture_devices(self):
-        """Scan for available video capture devices"""
-        self.available_devices = []
-        
-        # Test up to 10 device indices
-        for i in range(10):
-            # Try DirectShow first (better for Windows capture cards)
-            cap = cv2.VideoCapture(i, cv2.CAP_DSHOW)
+    def get_device_name(self, device_index):
+        """Return a human-readable device name, from sysfs on Linux if available"""
+        sysfs_name = f"/sys/class/video4linux/video{device_index}/name"
+        if os.path.exists(sysfs_name):
+            try:
+                with open(sysfs_name, 'r') as f:
+                    return f.read().strip()
+            except OSError:
+                pass
+        return f"Device {device_index}"
+
+    def get_device_path(self, device_index):
+        """Return the bus path of a device from sysfs on Linux, or None"""
+        sysfs_device = f"/sys/class/video4linux/video{device_index}/device"
+        if os.path.exists(sysfs_device):
+            return os.path.realpath(sysfs_device)
+        return None
+
+    def probe_device(self, device_index):
+        """Open a device index and return its info, or None if no device is there"""
+        # Try DirectShow first (better for Windows capture cards)
+        cap = cv2.VideoCapture(device_index, cv2.CAP_DSHOW)
+        if not cap.isOpened():
+            cap = cv2.VideoCapture(device_index)
             if not cap.isOpened():
-                cap = cv2.VideoCapture(i)
-            
-            if cap.isOpened():
-                width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-                height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-                
-                device_info = {
-                    'index': i,
-                    'name': f"Device {i}",
-                    'width': width,
-                    'height': height,
-                    'resolution': f"{width}x{height}"
-                }
-                self.available_devices.append(device_info)
-                cap.release()
-        
-        # Update device dropdown if it exists
-        if hasattr(self, 'device_dropdown'):
-            self.update_device_dropdown()
-        
+                return None
+
+        try:
+            width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+            height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            backend = cap.getBackendName()
+        finally:
+            cap.release()
+
+        name = self.get_device_name(device_index)
+        # The sysfs path pins the USB port or PCI slot on Linux. Elsewhere the name is just the index,
+        # so the default resolution is the only hint that a different device now sits at this index
+        identity = self.get_device_path(device_index) or f"{width}x{height}"
+        return {
+            'index': device_index,
+            'name': name,
+            'id': f"{backend}:{device_index}:{name}:{identity}",
+            'width': width,
+            'height': height,
+            'resolution': f"{width}x{height}"
+        }
+
+    def scan_capture_devices(self):
+        """Scan for available video capture devices, probing all indices in parallel"""
+        # Test up to 10 device indices; absent indices time out concurrently instead of one by one
+        with ThreadPoolExecutor(max_workers=10) as pool:
+            devices = list(pool.map(self.probe_device, range(10)))
+        return [d for d in devices if d is not None]
+
+    def scan_capture_devices_async(self, on_done=None):
+        """Scan for capture devices in a background thread and update the dropdown when done"""
+        # A scan already in flight runs on_done when it finishes instead of starting another
+        if on_done is not None:
+            self.device_scan_callbacks.append(on_done)
+        if self.device_scan_running:
+            return
+        self.device_scan_running = True
+
+        def scan_thread():
+            devices = self.scan_capture_devices()
+            self.root.after(0, self._on_devices_scanned, devices)
+
+        thread = threading.Thread(target=scan_thread, daemon=True)
+        thread.start()
+
+    def _on_devices_scanned(self, devices):
+        """Apply the result of a device scan (called from main thread)"""
+        self.device_scan_running = False
+        self.available_devices = devices
+        self.device_cache['devices'] = devices
+        self.save_device_cache()
+
+        self.update_device_dropdown(revalidate=True)
         self.log(f"Found {len(self.available_devices)} capture device(s)")
-        return self.available_devices
 
-    def update_device_dropdown(self):
+        callbacks, self.device_scan_callbacks = self.device_scan_callbacks, []
+        for on_done in callbacks:
+            on_done()
+
+    def get_device_id(self, device_index):
+        """Return the cache key of a device index, or None if the device is unknown"""
+        for d in self.available_devices:
+            if d['index'] == device_index:
+                return d.get('id')
+        return None
+
+    def update_device_dropdown(self, revalidate=False):
         """Update the device dropdown with available devices"""
         if not self.available_devices:
             device_names = ["No devices found"]
@@ -452,25 +2542,44 @@ class ScreenGrabberApp:
             self.capture_device_index.set(self.available_devices[0]['index'])
         
         # Update resolution dropdown for selected device
-        self.update_resolution_dropdown()
+        self.update_resolution_dropdown(revalidate=revalidate)
 
-    def update_resolution_dropdown(self):
-        """Update the resolution dropdown for the current device"""
+    def update_resolution_dropdown(self, revalidate=True):
+        """Update the resolution dropdown for the current device, showing cached resolutions first"""
         device_index = self.capture_device_index.get()
-        
+        device_id = self.get_device_id(device_index)
+
+        cached = self.device_cache['resolutions'].get(device_id) if device_id else None
+        if cached:
+            self._update_resolution_dropdown_ui(device_index, [tuple(r) for r in cached])
+        else:
+            self.resolution_dropdown['values'] = ["Scanning..."]
+            self.resolution_dropdown.current(0)
+
+        if not revalidate:
+            return
+
         # Probe resolutions in background to avoid UI freeze
         def probe_thread():
             resolutions = self.probe_device_resolutions(device_index)
-            self.root.after(0, lambda: self._update_resolution_dropdown_ui(resolutions))
-        
-        self.resolution_dropdown['values'] = ["Scanning..."]
-        self.resolution_dropdown.current(0)
+            self.root.after(0, self._on_resolutions_probed, device_index, device_id, resolutions)
         
         thread = threading.Thread(target=probe_thread, daemon=True)
         thread.start()
 
-    def _update_resolution_dropdown_ui(self, resolutions):
+    def _on_resolutions_probed(self, device_index, device_id, resolutions):
+        """Cache freshly probed resolutions and refresh the dropdown (called from main thread)"""
+        if device_id is not None and resolutions:
+            self.device_cache['resolutions'][device_id] = [list(r) for r in resolutions]
+            self.save_device_cache()
+        self._update_resolution_dropdown_ui(device_index, resolutions)
+
+    def _update_resolution_dropdown_ui(self, device_index, resolutions):
         """Update resolution dropdown UI (called from main thread)"""
+        # Ignore results for a device that is no longer selected
+        if device_index != self.capture_device_index.get():
+            return
+
         self.available_resolutions = resolutions
         
         if not resolutions:
@@ -499,7 +2608,7 @@ class ScreenGrabberApp:
             self.update_resolution_dropdown()
             
             # Restart capture card if currently using it
-            if self.capture_source.get() == 'capture_card' and self.capture_card_running:
+            if self.capture_source.get() not in SCREEN_SOURCES and self.capture_card_running:
                 self.stop_capture_card()
                 self.start_capture_card()
 
@@ -509,7 +2618,7 @@ class ScreenGrabberApp:
         self.capture_resolution.set(selection)
         
         # Restart capture card if currently running
-        if self.capture_source.get() == 'capture_card' and self.capture_card_running:
+        if self.capture_source.get() not in SCREEN_SOURCES and self.capture_card_running:
             self.stop_capture_card()
             self.start_capture_card()
 
@@ -536,8 +2645,16 @@ class ScreenGrabberApp:
         ttk.Label(source_frame, text="Capture Source:").pack(side=tk.LEFT)
         ttk.Radiobutton(source_frame, text="Screenshot (MSS)", variable=self.capture_source,
                         value='mss', command=self.on_capture_source_change).pack(side=tk.LEFT, padx=5)
+        ttk.Radiobutton(source_frame, text="Screen (XShm)", variable=self.capture_source,
+                        value='xshm', command=self.on_capture_source_change,
+                        state=tk.NORMAL if XSHM_AVAILABLE else tk.DISABLED).pack(side=tk.LEFT, padx=5)
         ttk.Radiobutton(source_frame, text="Capture Card", variable=self.capture_source,
                         value='capture_card', command=self.on_capture_source_change).pack(side=tk.LEFT, padx=5)
+        ttk.Radiobutton(source_frame, text="V4L2 (Linux)", variable=self.capture_source,
+                        value='v4l2', command=self.on_capture_source_change,
+                        state=tk.NORMAL if V4L2_AVAILABLE else tk.DISABLED).pack(side=tk.LEFT, padx=5)
+        ttk.Radiobutton(source_frame, text="Replay File", variable=self.capture_source,
+                        value='replay', command=self.on_capture_source_change).pack(side=tk.LEFT, padx=5)
 
         # Capture card device selection frame
         self.capture_card_options_frame = ttk.Frame(left_slider_frame)
@@ -574,6 +2691,30 @@ class ScreenGrabberApp:
         self.capture_card_status_label = ttk.Label(status_row, text="Status: Stopped", foreground="gray")
         self.capture_card_status_label.pack(side=tk.LEFT)
 
+        # Replay file selection frame
+        self.replay_options_frame = ttk.Frame(left_slider_frame)
+
+        replay_file_row = ttk.Frame(self.replay_options_frame)
+        replay_file_row.pack(fill=tk.X, pady=2)
+
+        ttk.Label(replay_file_row, text="File:", width=10).pack(side=tk.LEFT)
+        ttk.Label(replay_file_row, textvariable=self.replay_path, width=25,
+                  relief="sunken", anchor="w").pack(side=tk.LEFT, padx=5)
+        ttk.Button(replay_file_row, text="Browse", command=self.browse_replay).pack(side=tk.LEFT, padx=2)
+
+        replay_pacing_row = ttk.Frame(self.replay_options_frame)
+        replay_pacing_row.pack(fill=tk.X, pady=2)
+
+        ttk.Label(replay_pacing_row, text="Pacing:", width=10).pack(side=tk.LEFT)
+        for text, value in (("Real-time", 'realtime'), ("Fast", 'fast'), ("Step", 'step')):
+            ttk.Radiobutton(replay_pacing_row, text=text, variable=self.replay_pacing, value=value,
+                            command=self.on_replay_pacing_change).pack(side=tk.LEFT, padx=2)
+        ttk.Button(replay_pacing_row, text="Step", command=self.step_replay).pack(side=tk.LEFT, padx=5)
+        ttk.Checkbutton(replay_pacing_row, text="Loop", variable=self.replay_loop).pack(side=tk.LEFT, padx=2)
+
+        self.replay_status_label = ttk.Label(self.replay_options_frame, text="Frame: —", foreground="gray")
+        self.replay_status_label.pack(anchor='w', pady=2)
+
         # Screen region sliders (always visible for cropping)
         self.slider_widgets = {}
         self.slider_labels = {}
@@ -605,13 +2746,41 @@ class ScreenGrabberApp:
                         value='classical', command=self.on_tracking_method_change).pack(side=tk.LEFT, padx=5)
         ttk.Radiobutton(method_frame, text="ML (YOLO)", variable=self.tracking_method,
                         value='ml', command=self.on_tracking_method_change).pack(side=tk.LEFT, padx=5)
+        ttk.Radiobutton(method_frame, text="Phase Correlation", variable=self.tracking_method,
+                        value='phase', command=self.on_tracking_method_change).pack(side=tk.LEFT, padx=5)
+
+        self.uint8_checkbox = ttk.Checkbutton(right_slider_frame, text="8-bit Pipeline",
+                                              variable=self.uint8_pipeline)
+        self.uint8_checkbox.pack(anchor='w', pady=2)
+
+        self.skip_unchanged_checkbox = ttk.Checkbutton(right_slider_frame, text="Skip Unchanged Frames",
+                                                       variable=self.skip_unchanged)
+        self.skip_unchanged_checkbox.pack(anchor='w', pady=2)
+
+        self.target_lock_checkbox = ttk.Checkbutton(right_slider_frame, text="Lock Target (Kalman)",
+                                                    variable=self.target_lock, command=self.tracker.reset)
+        self.target_lock_checkbox.pack(anchor='w', pady=2)
+
+        multi_roi_frame = ttk.Frame(right_slider_frame)
+        multi_roi_frame.pack(fill=tk.X, pady=2)
+        ttk.Checkbutton(multi_roi_frame, text="Multi-ROI", variable=self.multi_roi).pack(side=tk.LEFT)
+        ttk.Entry(multi_roi_frame, textvariable=self.multi_roi_spec, width=18).pack(side=tk.LEFT, padx=5)
+        ttk.Label(multi_roi_frame, text="(e.g. 2x1 or x,y,w,h; ...)", foreground="gray").pack(side=tk.LEFT)
 
         # Classical tracking sliders
         self.classical_sliders_frame = ttk.Frame(right_slider_frame)
         self.classical_sliders_frame.pack(fill=tk.X)
 
-        self.add_slider(self.classical_sliders_frame, "Blur", self.blur_var, 1, 31)
+        self.add_slider(self.classical_sliders_frame, "Blur", self.blur_var, 1, 101)
         self.add_slider(self.classical_sliders_frame, "Thresh", self.thresh_var, 0.0, 1.0)
+
+        self.fast_blur_checkbox = ttk.Checkbutton(self.classical_sliders_frame, text="Fast Large Blur",
+                                                  variable=self.fast_blur)
+        self.fast_blur_checkbox.pack(anchor='w', pady=2)
+
+        self.window_search_checkbox = ttk.Checkbutton(self.classical_sliders_frame, text="Windowed Search",
+                                                      variable=self.window_search)
+        self.window_search_checkbox.pack(anchor='w', pady=2)
         
         # Invert contrast checkbox for classical method
         self.invert_checkbox = ttk.Checkbutton(self.classical_sliders_frame, text="Invert Contrast", 
@@ -640,12 +2809,59 @@ class ScreenGrabberApp:
         self.model_status_label = ttk.Label(model_frame, text="Not loaded", foreground="red")
         self.model_status_label.pack(side=tk.LEFT, padx=5)
 
+        # Inference backend
+        backend_frame = ttk.Frame(self.ml_sliders_frame)
+        backend_frame.pack(fill=tk.X, pady=2)
+        ttk.Label(backend_frame, text="Backend:").pack(side=tk.LEFT)
+        for value, text in (('pytorch', "PyTorch"), ('onnxruntime', "ONNX Runtime"), ('openvino', "OpenVINO")):
+            ttk.Radiobutton(backend_frame, text=text, variable=self.yolo_backend, value=value,
+                            command=self.on_yolo_backend_change).pack(side=tk.LEFT, padx=3)
+        self.export_model_btn = ttk.Button(backend_frame, text="Export", command=self.export_model)
+        self.export_model_btn.pack(side=tk.LEFT, padx=2)
+        self.quantize_model_btn = ttk.Button(backend_frame, text="Quantize", command=self.quantize_model)
+        self.quantize_model_btn.pack(side=tk.LEFT, padx=2)
+
+        threads_frame = ttk.Frame(self.ml_sliders_frame)
+        threads_frame.pack(fill=tk.X, pady=2)
+        ttk.Label(threads_frame, text="Threads:").pack(side=tk.LEFT)
+        ttk.Spinbox(threads_frame, from_=0, to=os.cpu_count() or 64, width=3,
+                    textvariable=self.yolo_intra_threads).pack(side=tk.LEFT, padx=3)
+        ttk.Label(threads_frame, text="intra").pack(side=tk.LEFT)
+        ttk.Spinbox(threads_frame, from_=0, to=os.cpu_count() or 64, width=3,
+                    textvariable=self.yolo_inter_threads).pack(side=tk.LEFT, padx=3)
+        ttk.Label(threads_frame, text="inter").pack(side=tk.LEFT)
+        ttk.Checkbutton(threads_frame, text="Load at Startup",
+                        variable=self.yolo_preload).pack(side=tk.LEFT, padx=8)
+
+        classes_frame = ttk.Frame(self.ml_sliders_frame)
+        classes_frame.pack(fill=tk.X, pady=2)
+        ttk.Label(classes_frame, text="Classes:").pack(side=tk.LEFT)
+        ttk.Entry(classes_frame, textvariable=self.yolo_classes, width=12).pack(side=tk.LEFT, padx=5)
+        ttk.Label(classes_frame, text="(e.g. 0,2; blank = all)", foreground="gray").pack(side=tk.LEFT)
+
+        self.yolo_roi_checkbox = ttk.Checkbutton(self.ml_sliders_frame, text="ROI Inference",
+                                                 variable=self.yolo_roi)
+        self.yolo_roi_checkbox.pack(anchor='w', pady=2)
+
+        self.yolo_cascade_checkbox = ttk.Checkbutton(self.ml_sliders_frame, text="Track Between Detections",
+                                                     variable=self.yolo_cascade)
+        self.yolo_cascade_checkbox.pack(anchor='w', pady=2)
+
         # YOLO FPS label
         yolo_fps_frame = ttk.Frame(self.ml_sliders_frame)
         yolo_fps_frame.pack(fill=tk.X, pady=2)
         self.yolo_fps_label = ttk.Label(yolo_fps_frame, text="YOLO FPS: 0")
         self.yolo_fps_label.pack(side=tk.LEFT)
 
+        # Phase correlation options
+        self.phase_frame = ttk.Frame(right_slider_frame)
+        phase_ref_frame = ttk.Frame(self.phase_frame)
+        phase_ref_frame.pack(fill=tk.X, pady=5)
+        self.phase_ref_btn = ttk.Button(phase_ref_frame, text="Set Reference", command=self.request_phase_reference)
+        self.phase_ref_btn.pack(side=tk.LEFT, padx=2)
+        self.phase_status_label = ttk.Label(phase_ref_frame, text="Peak: —")
+        self.phase_status_label.pack(side=tk.LEFT, padx=5)
+
         # Common sliders
         self.add_slider(right_slider_frame, "Margin", self.margin_var, 1, 100)
         self.add_slider(right_slider_frame, "Area LB", self.area_lb_var, 10, 10000)
@@ -679,6 +2895,7 @@ class ScreenGrabberApp:
         self.add_text_input(right_text_frame, "Delay time (s)", self.config.get('delay', str(self.delay)))
         self.add_text_input(right_text_frame, "Trans threshold (px)", self.config.get('trans_threshold', str(self.transThres)))
         self.add_text_input(right_text_frame, "Multiplier", self.config.get('multiplier', str(self.multiplier)))
+        self.add_text_input(right_text_frame, "Record every N", self.config.get('record_every_n', str(self.record_every_n)))
 
         # === CONTROLS SECTION (horizontal layout) ===
         controls_frame = ttk.LabelFrame(row2_frame, text="Controls")
@@ -725,6 +2942,14 @@ class ScreenGrabberApp:
         self.tracking_status_label = ttk.Label(controls_left, text="Tracking: ON | Idle", foreground="blue")
         self.tracking_status_label.pack(fill=tk.X, pady=3)
 
+        # Frame recording during tilt series
+        self.record_check = ttk.Checkbutton(controls_left, text="Record Frames During Tilt",
+                                            variable=self.record_frames)
+        self.record_check.pack(anchor='w', pady=3)
+
+        self.recorder_status_label = ttk.Label(controls_left, text="Recorder: Idle", foreground="gray")
+        self.recorder_status_label.pack(fill=tk.X, pady=3)
+
         # Separator
         ttk.Separator(controls_inner, orient='vertical').pack(side=tk.LEFT, fill=tk.Y, padx=10)
 
@@ -761,6 +2986,9 @@ class ScreenGrabberApp:
         self.fps_label = ttk.Label(info_frame, text="FPS: 0")
         self.fps_label.pack(side=tk.LEFT, padx=10)
 
+        self.multi_roi_label = ttk.Label(info_frame, text="")
+        self.multi_roi_label.pack(side=tk.LEFT, padx=10)
+
         # Matplotlib figures in one row
         self.fig, self.ax = plt.subplots(1, 4, figsize=(12, 3))
         self.ims = []
@@ -788,22 +3016,124 @@ class ScreenGrabberApp:
         self.log_box = tk.Text(log_frame, height=6, width=100, state='disabled')
         self.log_box.pack(padx=5, pady=5)
         
-        # Update device dropdown after building UI
+        # Show cached devices right away; the background scan revalidates them
         self.update_device_dropdown()
 
     def on_capture_source_change(self):
         """Handle capture source change"""
         source = self.capture_source.get()
         
-        if source == 'mss':
+        region_frame = self.slider_widgets["X"].master
+        if source != 'replay':
+            self.replay_options_frame.pack_forget()
+            self.close_replay()
+
+        if source in SCREEN_SOURCES:
             # Hide capture card options
             self.capture_card_options_frame.pack_forget()
             self.stop_capture_card()
-            self.log("Switched to MSS screenshot capture")
+            if hasattr(self, 'sct'):
+                # Restart so the producer matches the selected screen source
+                self.stop_mss_capture()
+                self.start_mss_capture()
+            if source == 'xshm':
+                self.log("Switched to change-driven XShm screen capture")
+            else:
+                self.log("Switched to MSS screenshot capture")
+        elif source == 'replay':
+            self.stop_mss_capture()
+            self.stop_capture_card()
+            self.capture_card_options_frame.pack_forget()
+            self.replay_options_frame.pack(fill=tk.X, pady=5, before=region_frame)
+            self.open_replay()
         else:
+            self.stop_mss_capture()
+            # Capture card and V4L2 share the device thread, so stop whichever was running
+            self.stop_capture_card()
             # Show capture card options
-            self.capture_card_options_frame.pack(fill=tk.X, pady=5, before=self.slider_widgets.get("X", None).master if "X" in self.slider_widgets else None)
-            self.log("Switched to capture card mode")
+            self.capture_card_options_frame.pack(fill=tk.X, pady=5, before=region_frame)
+            self.log("Switched to V4L2 capture mode" if source == 'v4l2' else "Switched to capture card mode")
+
+    def browse_replay(self):
+        filepath = filedialog.askopenfilename(
+            title="Select Recording",
+            filetypes=[("Recordings", "*.npy *.tif *.tiff *.avi *.mp4 *.mkv *.mov"), ("All files", "*.*")]
+        )
+        if filepath:
+            self.replay_path.set(filepath)
+            if self.capture_source.get() == 'replay':
+                self.open_replay()
+
+    def open_replay(self):
+        """Open the selected recording and rewind to its first frame"""
+        self.close_replay()
+        path = self.replay_path.get()
+        if not os.path.exists(path):
+            self.log("Please select a recording to replay")
+            return
+
+        try:
+            self.replay_source = ReplaySource(path)
+        except Exception as e:
+            self.log(f"Failed to open recording: {e}")
+            self.replay_status_label.config(text="Frame: —", foreground="red")
+            return
+
+        self.replay_index = -1
+        self.replay_clock = (time.time(), 0)
+        self.log(f"Replaying {os.path.basename(path)} ({self.replay_source.frame_count} frames, "
+                 f"{self.replay_source.fps:.1f} fps)")
+
+    def close_replay(self):
+        if self.replay_source is not None:
+            self.replay_source.release()
+            self.replay_source = None
+        self.replay_frame = None
+
+    def on_replay_pacing_change(self):
+        # Real-time playback continues from the current frame
+        self.replay_clock = (time.time(), max(self.replay_index, 0))
+
+    def step_replay(self):
+        self.replay_step_requested = True
+
+    def get_replay_frame(self):
+        """Advance the replay according to the pacing mode and return the current frame, uncropped"""
+        source = self.replay_source
+        if source is None:
+            return None
+
+        pacing = self.replay_pacing.get()
+        if self.replay_frame is None:
+            target = max(self.replay_index, 0)
+        elif pacing == 'realtime':
+            start_time, start_index = self.replay_clock
+            target = start_index + int((time.time() - start_time) * source.fps)
+        elif pacing == 'step':
+            target = self.replay_index + (1 if self.replay_step_requested else 0)
+        else:
+            target = self.replay_index + 1
+        self.replay_step_requested = False
+
+        if target == self.replay_index and self.replay_frame is not None:
+            return self.replay_frame
+
+        frame = source.read(target) if target < source.frame_count or source.frame_count <= 0 else None
+        if frame is None:
+            if not self.replay_loop.get():
+                # Hold the last frame at the end of the recording
+                return self.replay_frame
+            target = 0
+            self.replay_clock = (time.time(), 0)
+            frame = source.read(0)
+            if frame is None:
+                return self.replay_frame
+
+        self.replay_frame = frame
+        self.replay_index = target
+        self.replay_seq += 1
+        self.replay_status_label.config(text=f"Frame: {target + 1}/{source.frame_count}", foreground="green")
+        return frame
 
     def toggle_capture_card(self):
         """Toggle capture card on/off"""
@@ -821,15 +3151,12 @@ class ScreenGrabberApp:
         if was_running:
             self.stop_capture_card()
         
-        # Scan for devices
-        self.scan_capture_devices()
-        
-        # Update dropdown
-        self.update_device_dropdown()
-        
-        # Restart if it was running
-        if was_running and self.capture_source.get() == 'capture_card':
-            self.start_capture_card()
+        # Restart if it was running, once the background scan has updated the dropdown
+        def on_done():
+            if was_running and self.capture_source.get() not in SCREEN_SOURCES:
+                self.start_capture_card()
+
+        self.scan_capture_devices_async(on_done)
 
     def start_capture_card(self):
         """Start capture card capture thread"""
@@ -839,29 +3166,41 @@ class ScreenGrabberApp:
         
         device_index = self.capture_device_index.get()
         
-        # Open capture device with DirectShow (better Windows support)
-        self.capture_card = cv2.VideoCapture(device_index, cv2.CAP_DSHOW)
-        
-        if not self.capture_card.isOpened():
-            # Try without DirectShow
-            self.capture_card = cv2.VideoCapture(device_index)
-            if not self.capture_card.isOpened():
-                self.log(f"Failed to open capture device {device_index}")
-                self.capture_card_status_label.config(text="Status: Failed to open", foreground="red")
-                return
-        
-        # Set resolution if specified
+        resolution = None
         res_str = self.capture_resolution.get()
         if res_str and 'x' in res_str:
             try:
-                w, h = map(int, res_str.split('x'))
-                self.capture_card.set(cv2.CAP_PROP_FRAME_WIDTH, w)
-                self.capture_card.set(cv2.CAP_PROP_FRAME_HEIGHT, h)
-            except:
+                resolution = tuple(map(int, res_str.split('x')))
+            except ValueError:
                 pass
-        
-        # Set buffer size to minimum to reduce latency
-        self.capture_card.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+        if self.capture_source.get() == 'v4l2':
+            try:
+                self.capture_card = V4L2Capture(device_index, resolution)
+            except OSError as e:
+                self.capture_card = None
+                self.log(f"Failed to open V4L2 device {device_index}: {e}")
+                self.capture_card_status_label.config(text="Status: Failed to open", foreground="red")
+                return
+        else:
+            # Open capture device with DirectShow (better Windows support)
+            self.capture_card = cv2.VideoCapture(device_index, cv2.CAP_DSHOW)
+            
+            if not self.capture_card.isOpened():
+                # Try without DirectShow
+                self.capture_card = cv2.VideoCapture(device_index)
+                if not self.capture_card.isOpened():
+                    self.log(f"Failed to open capture device {device_index}")
+                    self.capture_card_status_label.config(text="Status: Failed to open", foreground="red")
+                    return
+            
+            # Set resolution if specified
+            if resolution is not None:
+                self.capture_card.set(cv2.CAP_PROP_FRAME_WIDTH, resolution[0])
+                self.capture_card.set(cv2.CAP_PROP_FRAME_HEIGHT, resolution[1])
+            
+            # Set buffer size to minimum to reduce latency
+            self.capture_card.set(cv2.CAP_PROP_BUFFERSIZE, 1)
         
         # Get actual resolution
         width = int(self.capture_card.get(cv2.CAP_PROP_FRAME_WIDTH))
@@ -876,6 +3215,12 @@ class ScreenGrabberApp:
             self.capture_card = None
             return
         
+        # Ring slots hold the cropped ROI tile, not the full frame
+        self.publish_capture_card_roi()
+        _, _, roi_w, roi_h, gray = self.capture_card_roi
+        tile_shape = (roi_h, roi_w) if gray else (roi_h, roi_w) + frame.shape[2:]
+        self.capture_card_ring = FrameRing(self.capture_card_ring_slots, tile_shape, frame.dtype)
+        self.capture_card_size = (width, height)
         self.capture_card_running = True
         self.capture_card_thread = threading.Thread(target=self.capture_card_loop, daemon=True)
         self.capture_card_thread.start()
@@ -898,8 +3243,7 @@ class ScreenGrabberApp:
             self.capture_card.release()
             self.capture_card = None
         
-        with self.capture_card_lock:
-            self.capture_card_latest_frame = None
+        self.capture_card_ring = None
         
         if hasattr(self, 'capture_card_status_label'):
             self.capture_card_status_label.config(text="Status: Stopped", foreground="gray")
@@ -910,13 +3254,26 @@ class ScreenGrabberApp:
         """Background thread for capture card frame capture"""
         consecutive_failures = 0
         max_failures = 10
+        ring = self.capture_card_ring
+        decode_buf = None
         
         while self.capture_card_running and self.capture_card is not None:
             try:
-                ret, frame = self.capture_card.read()
+                index, slot = ring.acquire_write()
+                if index is None:
+                    # Consumer holds every slot; skip this frame to keep the stream current
+                    self.capture_card.grab()
+                    continue
+
+                ret, frame = self.capture_card.read(decode_buf)
                 if ret and frame is not None:
-                    with self.capture_card_lock:
-                        self.capture_card_latest_frame = frame.copy()
+                    timestamp = time.time()
+                    decode_buf = frame
+
+                    # Only the cropped ROI, gray in the 8-bit pipeline, goes into the ring slot
+                    x, y, w, h, gray = self.capture_card_roi
+                    tile = crop_roi(frame, x, y, w, h, gray, out=slot)
+                    ring.publish(index, tile, timestamp)
                     consecutive_failures = 0
                 else:
                     consecutive_failures += 1
@@ -933,65 +3290,324 @@ class ScreenGrabberApp:
         self.capture_card_running = False
         self.root.after(0, lambda: self.capture_card_btn.config(text="Start"))
 
+    def start_mss_capture(self):
+        """Start the screen-grab producer thread for the selected screen source"""
+        if self.mss_running:
+            return
+
+        if self.capture_source.get() == 'xshm':
+            target = self.xshm_capture_loop
+        else:
+            target = self.mss_capture_loop
+        self.mss_running = True
+        self.mss_thread = threading.Thread(target=target, daemon=True)
+        self.mss_thread.start()
+
+    def stop_mss_capture(self):
+        """Stop the MSS screen-grab producer thread"""
+        self.mss_running = False
+
+        if self.mss_thread is not None:
+            self.mss_thread.join(timeout=1.0)
+            self.mss_thread = None
+
+        with self.mss_lock:
+            self.mss_latest_frame = None
+
+    def mss_capture_loop(self):
+        """Background thread for MSS screen grabs, keeping only the newest frame"""
+        min_interval = 1.0 / self.mss_max_fps
+
+        # MSS handles cannot be shared across threads, so the producer owns its own
+        with mss.mss() as sct:
+            while self.mss_running:
+                start = time.time()
+                monitor = self.mss_monitor
+                if monitor is None:
+                    time.sleep(0.01)
+                    continue
+
+                try:
+                    img = np.asarray(sct.grab(monitor))
+                    with self.mss_lock:
+                        self.mss_latest_frame = img
+                        self.mss_frame_seq += 1
+                        self.mss_frame_time = start
+                except Exception as e:
+                    print(f"MSS capture error: {e}")
+                    time.sleep(0.1)
+
+                remaining = min_interval - (time.time() - start)
+                if remaining > 0:
+                    time.sleep(remaining)
+
+    def xshm_capture_loop(self):
+        """Background thread for XShm screen grabs, publishing a frame only when the region changed"""
+        try:
+            grabber = XShmDamageGrabber()
+        except Exception as e:
+            # Fall back to synchronous MSS grabs in grab_mss_frame
+            self.mss_running = False
+            self.root.after(0, self.log, f"XShm capture unavailable ({e}), using MSS")
+            return
+
+        last_monitor = None
+        try:
+            while self.mss_running:
+                monitor = self.mss_monitor
+                if monitor is None:
+                    time.sleep(0.01)
+                    continue
+
+                try:
+                    # A moved or resized region always needs a fresh grab
+                    changed = grabber.wait_for_damage(monitor, timeout=0.05) or monitor != last_monitor
+                    if not changed:
+                        continue
+                    start = time.time()
+                    img = grabber.grab(monitor)
+                    last_monitor = monitor
+                    with self.mss_lock:
+                        self.mss_latest_frame = img
+                        self.mss_frame_seq += 1
+                        self.mss_frame_time = start
+                except Exception as e:
+                    if last_monitor is None:
+                        # The shared segment could not be set up at all; fall back to MSS
+                        self.mss_running = False
+                        self.root.after(0, self.log, f"XShm capture unavailable ({e}), using MSS")
+                        break
+                    print(f"XShm capture error: {e}")
+                    time.sleep(0.1)
+        finally:
+            grabber.close()
+
+    def grab_mss_frame(self, monitor):
+        """Return the newest BGRA screen grab, grabbing synchronously if the producer has none yet"""
+        # Publish the region for the producer thread
+        self.mss_monitor = monitor
+
+        img = None
+        if self.mss_running:
+            with self.mss_lock:
+                img = self.mss_latest_frame
+                seq = self.mss_frame_seq
+                frame_time = self.mss_frame_time
+
+        if img is None:
+            frame_time = time.time()
+            img = np.asarray(self.sct.grab(monitor))
+            with self.mss_lock:
+                self.mss_frame_seq += 1
+                seq = self.mss_frame_seq
+
+        self.frame_seq = seq
+        self.frame_time = frame_time
+        return img
+
     def get_capture_frame(self):
         """Get the current frame from the selected capture source with cropping"""
-        if self.capture_source.get() == 'mss':
-            # MSS screenshot capture
+        if self.capture_source.get() in SCREEN_SOURCES:
+            # MSS / XShm screenshot capture
             x, y = self.x_var.get(), self.y_var.get()
             w = self.w_var.get()
             h = w if self.square_var.get() else self.h_var.get()
 
             monitor = {"top": y, "left": x, "width": w, "height": h}
-            img = self.sct.grab(monitor)
-            img_np = np.array(img)[:, :, :3]  # Remove alpha channel, keep BGR
+            img = self.grab_mss_frame(monitor)
+            if self.uint8_pipeline.get():
+                # Convert BGRA straight into the reusable gray buffer
+                img_gray = self.get_buffer('capture_gray', img.shape[:2])
+                return cv2.cvtColor(img, cv2.COLOR_BGRA2GRAY, dst=img_gray)
+            img_np = img[:, :, :3]  # Remove alpha channel, keep BGR
             return img_np
-        else:
-            # Capture card
-            with self.capture_card_lock:
-                if self.capture_card_latest_frame is not None:
-                    frame = self.capture_card_latest_frame.copy()
-                else:
-                    # Return a black frame if no capture available
-                    return np.zeros((self.img_size, self.img_size, 3), dtype='uint8')
-            
-            # Apply cropping to capture card frame
-            frame_h, frame_w = frame.shape[:2]
-            x = min(self.x_var.get(), frame_w - 1)
-            y = min(self.y_var.get(), frame_h - 1)
+        elif self.capture_source.get() == 'replay':
+            # Recorded frames, cropped like a capture card frame
+            frame = self.get_replay_frame()
+            if frame is None:
+                return self.get_black_frame()
+            self.frame_seq = self.replay_seq
+            self.frame_time = time.time()
+            x, y = self.x_var.get(), self.y_var.get()
             w = self.w_var.get()
             h = w if self.square_var.get() else self.h_var.get()
-            
-            # Ensure we don't go out of bounds
-            x2 = min(x + w, frame_w)
-            y2 = min(y + h, frame_h)
-            
-            # Crop the frame
-            cropped = frame[y:y2, x:x2]
-            
-            # If cropped region is too small, pad with black
-            if cropped.shape[0] < h or cropped.shape[1] < w:
-                padded = np.zeros((h, w, 3), dtype='uint8')
-                padded[:cropped.shape[0], :cropped.shape[1]] = cropped
-                return padded
-            
-            return cropped
+            if self.uint8_pipeline.get():
+                return crop_roi(frame, x, y, w, h, True, out=self.get_buffer('capture_gray', (h, w)))
+            tile = crop_roi(frame, x, y, w, h, False)
+            return tile if tile.ndim == 3 else cv2.cvtColor(tile, cv2.COLOR_GRAY2BGR)
+        else:
+            # Capture card: the capture thread already cropped (and grayed) the ROI
+            self.publish_capture_card_roi()
+            ring = self.capture_card_ring
+            borrowed = ring.borrow() if ring is not None else None
+            if borrowed is None:
+                # Return a black frame if no capture available
+                return self.get_black_frame()
+
+            index, tile, self.frame_seq, self.frame_time = borrowed
+            try:
+                return self.to_pipeline_format(tile)
+            finally:
+                ring.release(index)
+
+    def get_black_frame(self):
+        """Return a black frame in the current pipeline format"""
+        if self.uint8_pipeline.get():
+            img_gray = self.get_buffer('capture_gray', (self.img_size, self.img_size))
+            img_gray.fill(0)
+            return img_gray
+        return np.zeros((self.img_size, self.img_size, 3), dtype='uint8')
+
+    def to_pipeline_format(self, tile):
+        """Copy a cropped gray or BGR tile into the format the current pipeline expects"""
+        # The tile may still be in the previous format right after toggling the 8-bit pipeline
+        if self.uint8_pipeline.get():
+            img_gray = self.get_buffer('capture_gray', tile.shape[:2])
+            if tile.ndim == 2:
+                np.copyto(img_gray, tile)
+            else:
+                cv2.cvtColor(tile, cv2.COLOR_BGR2GRAY, dst=img_gray)
+            return img_gray
+        return tile.copy() if tile.ndim == 3 else cv2.cvtColor(tile, cv2.COLOR_GRAY2BGR)
+
+    def publish_capture_card_roi(self):
+        """Hand the current crop region and pixel format to the capture card thread"""
+        w = self.w_var.get()
+        h = w if self.square_var.get() else self.h_var.get()
+        self.capture_card_roi = (self.x_var.get(), self.y_var.get(), w, h, self.uint8_pipeline.get())
+
+    def get_buffer(self, name, shape, dtype='uint8'):
+        """Return a preallocated frame buffer, reallocating only when shape or dtype change"""
+        buf = self.buffers.get(name)
+        if buf is None or buf.shape != shape or buf.dtype != dtype:
+            buf = np.empty(shape, dtype=dtype)
+            self.buffers[name] = buf
+        return buf
 
     def browse_model(self):
         filepath = filedialog.askopenfilename(
             title="Select YOLO Model",
-            filetypes=[("YOLO Model", "*.pt"), ("All files", "*.*")]
+            filetypes=[("YOLO Model", "*.pt *.onnx *.xml"), ("All files", "*.*")]
         )
         if filepath:
             self.yolo_model_path.set(filepath)
-            self.model_status_label.config(text="Not loaded", foreground="red")
-            self.yolo_model = None
-            self.yolo_model_loaded = False
-            self.stop_yolo_thread()
+            self.unload_yolo_model()
 
-    def load_yolo_model(self):
+    def unload_yolo_model(self):
+        self.model_status_label.config(text="Not loaded", foreground="red")
+        self.yolo_model_loaded = False
+        self.stop_yolo_worker()
+
+    def on_yolo_classes_change(self, *args):
+        """Parse the class filter; anything unparsable keeps every class"""
+        try:
+            ids = [int(c) for c in self.yolo_classes.get().replace(' ', '').split(',') if c]
+        except ValueError:
+            ids = []
+        self.yolo_class_ids = ids or None
+
+    def on_yolo_backend_change(self):
+        """A loaded model belongs to one backend; switching requires loading again"""
+        if self.yolo_model_loaded:
+            self.unload_yolo_model()
+
+    def export_model(self):
+        """Export the selected .pt model for the chosen CPU backend at the processing size"""
+        backend = self.yolo_backend.get()
+        model_path = self.yolo_model_path.get()
+        if backend == 'pytorch':
+            self.log("Select the ONNX Runtime or OpenVINO backend to export for it")
+            return
         if not YOLO_AVAILABLE:
-            self.log("ultralytics not installed!")
-            self.model_status_label.config(text="ultralytics not available", foreground="red")
+            self.log("ultralytics is needed to export models")
+            return
+        if not model_path.endswith('.pt') or not os.path.exists(model_path):
+            self.log("Please select a .pt model to export!")
+            return
+
+        fmt = 'onnx' if backend == 'onnxruntime' else 'openvino'
+        # Exporting at img_size means frames need no rescaling at inference time. A dynamic shape
+        # is only exported when needed: ROI inference runs smaller crops and Multi-ROI batches regions
+        imgsz = self.img_size
+        dynamic = self.yolo_roi.get() or self.multi_roi.get()
+        self.export_model_btn.config(state=tk.DISABLED)
+        self.model_status_label.config(text="Exporting...", foreground="orange")
+        self.log(f"Exporting {model_path} to {fmt} at {imgsz}px{' (dynamic shape)' if dynamic else ''}")
+
+        def export_thread():
+            try:
+                exported = export_yolo_model(model_path, fmt, imgsz, dynamic=dynamic)
+                self.root.after(0, self._on_model_exported, exported, None)
+            except Exception as e:
+                self.root.after(0, self._on_model_exported, None, str(e))
+
+        threading.Thread(target=export_thread, daemon=True).start()
+
+    def _on_model_exported(self, exported, error_msg):
+        """Called in main thread when an export finishes"""
+        self.export_model_btn.config(state=tk.NORMAL)
+        if exported is None:
+            self.model_status_label.config(text="Export failed", foreground="red")
+            self.log(f"Failed to export model: {error_msg}")
+            return
+        self.log(f"Model exported: {exported}")
+        self.yolo_model_path.set(exported)
+        self.unload_yolo_model()
+
+    def quantize_model(self):
+        """Quantize the selected model to INT8, calibrated on a folder of recorded frames"""
+        model_path = self.yolo_model_path.get()
+        if not ONNXRUNTIME_AVAILABLE:
+            self.log("onnxruntime is needed to quantize models")
+            return
+        if not os.path.exists(model_path) or not model_path.endswith(('.pt', '.onnx')):
+            self.log("Please select a .pt or .onnx model to quantize!")
+            return
+        if model_path.endswith('.pt') and not YOLO_AVAILABLE:
+            self.log("ultralytics is needed to export the .pt model before quantizing")
+            return
+        frames_dir = filedialog.askdirectory(title="Select Recorded Frames",
+                                             initialdir="recordings" if os.path.isdir("recordings") else ".")
+        if not frames_dir:
+            return
+
+        imgsz = self.img_size
+        conf = self.confidence_var.get()
+        self.quantize_model_btn.config(state=tk.DISABLED)
+        self.model_status_label.config(text="Quantizing...", foreground="orange")
+        self.log(f"Quantizing {model_path} to INT8 with frames from {frames_dir}")
+
+        def quantize_thread():
+            try:
+                quantized, report = quantize_yolo_model(model_path, frames_dir, imgsz, conf=conf)
+                self.root.after(0, self._on_model_quantized, quantized, report, None)
+            except Exception as e:
+                self.root.after(0, self._on_model_quantized, None, None, str(e))
+
+        threading.Thread(target=quantize_thread, daemon=True).start()
+
+    def _on_model_quantized(self, quantized, report, error_msg):
+        """Called in main thread when quantization finishes"""
+        self.quantize_model_btn.config(state=tk.NORMAL)
+        if quantized is None:
+            self.model_status_label.config(text="Quantize failed", foreground="red")
+            self.log(f"Failed to quantize model: {error_msg}")
+            return
+        self.log(f"INT8 model: {quantized}")
+        self.log(f"INT8 vs FP32 on {format_quantization_report(report)}")
+        self.yolo_model_path.set(quantized)
+        if self.yolo_backend.get() == 'pytorch':
+            self.yolo_backend.set('onnxruntime')
+        self.unload_yolo_model()
+
+    def load_yolo_model(self):
+        backend = self.yolo_backend.get()
+        available = {'pytorch': YOLO_AVAILABLE, 'onnxruntime': ONNXRUNTIME_AVAILABLE,
+                     'openvino': OPENVINO_AVAILABLE}
+        if not available[backend]:
+            package = 'ultralytics' if backend == 'pytorch' else backend
+            self.log(f"{package} not installed!")
+            self.model_status_label.config(text=f"{package} not available", foreground="red")
             return
 
         model_path = self.yolo_model_path.get()
@@ -999,35 +3615,61 @@ class ScreenGrabberApp:
             self.log("Please select a valid model file first!")
             self.model_status_label.config(text="Invalid path", foreground="red")
             return
+        if backend != 'pytorch' and model_path.endswith('.pt'):
+            self.log(f"The {backend} backend needs an exported model; use Export first")
+            self.model_status_label.config(text="Export needed", foreground="red")
+            return
 
+        threads = self.get_yolo_threads()
+        warmup_batch = self.get_multi_roi_count()
         self.model_status_label.config(text="Loading...", foreground="orange")
         self.load_model_btn.config(state=tk.DISABLED)
-        self.log(f"Loading YOLO model from: {model_path}")
+        self.log(f"Loading YOLO model ({backend}, threads {threads[0]}/{threads[1]}) from: {model_path}")
 
         def load_thread():
+            worker = None
             try:
-                model = YOLO(model_path)
-                self.yolo_model = model
-                self.yolo_model_loaded = True
-                
+                # The model is loaded and warmed up at the processing size inside the inference process
+                worker = YOLOWorker(model_path, backend, (self.img_size, self.img_size), threads,
+                                    max_batch=self.multi_roi_max, warmup_batch=warmup_batch)
+                # Closing the app before the worker is handed over must still release it
+                self.yolo_loading_worker = worker
+                worker.start()
+                worker.wait_ready()
+
                 # Update UI in main thread
-                self.root.after(0, self._on_model_loaded_success, model_path)
+                self.root.after(0, self._on_model_loaded_success, model_path, worker)
             except Exception as e:
-                self.yolo_model = None
-                self.yolo_model_loaded = False
+                if worker is not None:
+                    worker.close()
+                    self.yolo_loading_worker = None
                 error_msg = str(e)
                 self.root.after(0, self._on_model_loaded_failure, error_msg)
 
         thread = threading.Thread(target=load_thread, daemon=True)
         thread.start()
 
-    def _on_model_loaded_success(self, model_path):
+    def get_yolo_threads(self):
+        """(intra-op, inter-op) inference thread counts; anything unparsable means the runtime default"""
+        threads = []
+        for var in (self.yolo_intra_threads, self.yolo_inter_threads):
+            try:
+                threads.append(max(0, int(var.get())))
+            except ValueError:
+                threads.append(0)
+        return tuple(threads)
+
+    def _on_model_loaded_success(self, model_path, worker):
         """Called in main thread when model loads successfully"""
+        self.yolo_loading_worker = None
+        self.stop_yolo_worker()
+        self.yolo_worker = worker
+        self.yolo_model_loaded = True
+        self.yolo_roi_lost = True
         self.model_status_label.config(text="Loaded", foreground="green")
         self.load_model_btn.config(state=tk.NORMAL)
-        self.log(f"YOLO model loaded successfully: {model_path}")
-        # Start YOLO prediction thread
-        self.start_yolo_thread()
+        self.log(f"YOLO model loaded and warmed up in {time.time() - worker.start_time:.1f} s: {model_path} "
+                 f"(inference process {worker.process.pid})")
 
     def _on_model_loaded_failure(self, error_msg):
         """Called in main thread when model fails to load"""
@@ -1035,123 +3677,13 @@ class ScreenGrabberApp:
         self.load_model_btn.config(state=tk.NORMAL)
         self.log(f"Failed to load YOLO model: {error_msg}")
 
-    def start_yolo_thread(self):
-        """Start the YOLO prediction thread"""
-        if self.yolo_thread is not None and self.yolo_thread.is_alive():
-            self.log("YOLO thread already running")
-            return
-        
-        if not self.yolo_model_loaded or self.yolo_model is None:
-            self.log("YOLO model not loaded, cannot start thread")
-            return
-        
-        self.yolo_running = True
-        self.yolo_thread = threading.Thread(target=self.yolo_prediction_loop, daemon=True)
-        self.yolo_thread.start()
-        self.log("YOLO prediction thread started")
-
-    def stop_yolo_thread(self):
-        """Stop the YOLO prediction thread"""
-        self.yolo_running = False
-        # Clear queues
-        while not self.yolo_input_queue.empty():
-            try:
-                self.yolo_input_queue.get_nowait()
-            except queue.Empty:
-                break
-        while not self.yolo_output_queue.empty():
-            try:
-                self.yolo_output_queue.get_nowait()
-            except queue.Empty:
-                break
-
-    def yolo_prediction_loop(self):
-        """Background thread for YOLO predictions"""
-        self.log("YOLO prediction loop started")
-        while self.yolo_running:
-            try:
-                if self.yolo_model is None:
-                    time.sleep(0.1)
-                    continue
-                    
-                # Get input image (blocking with timeout)
-                try:
-                    img_data = self.yolo_input_queue.get(timeout=0.5)
-                except queue.Empty:
-                    continue
-
-                img_resized, margin, area_lb, area_ub, confidence = img_data
-
-                # Convert to RGB for YOLO (8-bit)
-                img_8bit = (img_resized * 255).astype('uint8')
-                img_rgb = cv2.cvtColor(img_8bit, cv2.COLOR_GRAY2RGB)
-
-                # Run prediction
-                results = self.yolo_model(img_rgb, conf=confidence, verbose=False)
-
-                filtered_contours = []
-                centroids = []
-                bboxes = []
-                areas = []
-
-                for result in results:
-                    boxes = result.boxes
-                    if boxes is not None:
-                        for box in boxes:
-                            x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                            x1, y1, x2, y2 = int(x1), int(y1), int(x2), int(y2)
-
-                            # Check if bbox touches margin
-                            if x1 < margin or y1 < margin or x2 > (self.img_size - margin) or y2 > (self.img_size - margin):
-                                continue
-
-                            w = x2 - x1
-                            h = y2 - y1
-                            area = w * h
-
-                            if area_lb <= area <= area_ub:
-                                cx = (x1 + x2) // 2
-                                cy = (y1 + y2) // 2
-
-                                cnt = np.array([
-                                    [[x1, y1]],
-                                    [[x2, y1]],
-                                    [[x2, y2]],
-                                    [[x1, y2]]
-                                ])
-                                filtered_contours.append(cnt)
-                                centroids.append((cx, cy))
-                                bboxes.append((x1, y1, x2, y2))
-                                areas.append(area)
-
-                largest_index = int(np.argmax(areas)) if areas else None
-
-                # Put result in output queue (non-blocking)
-                # Clear old result first
-                while not self.yolo_output_queue.empty():
-                    try:
-                        self.yolo_output_queue.get_nowait()
-                    except queue.Empty:
-                        break
-                
-                try:
-                    self.yolo_output_queue.put_nowait((filtered_contours, centroids, bboxes, largest_index))
-                except queue.Full:
-                    pass
-
-                # Update YOLO FPS
-                self.yolo_frame_count += 1
-                now = time.time()
-                if now - self.yolo_last_time >= 1.0:
-                    self.yolo_fps = self.yolo_frame_count / (now - self.yolo_last_time)
-                    self.yolo_last_time = now
-                    self.yolo_frame_count = 0
-
-            except Exception as e:
-                print(f"YOLO thread error: {e}")
-                time.sleep(0.1)
-        
-        self.log("YOLO prediction loop ended")
+    def stop_yolo_worker(self):
+        """Stop the YOLO inference process, if one is running"""
+        if self.yolo_worker is not None:
+            self.yolo_worker.close()
+            self.yolo_worker = None
+        self.latest_yolo_result = None
+        self.cascade_submit_time = None
 
     def add_slider(self, parent, name, var, from_, to):
         row = ttk.Frame(parent)
@@ -1194,13 +3726,17 @@ class ScreenGrabberApp:
         method = self.tracking_method.get()
         if method == 'classical':
             self.ml_sliders_frame.pack_forget()
+            self.phase_frame.pack_forget()
             self.classical_sliders_frame.pack(fill=tk.X)
+        elif method == 'phase':
+            self.classical_sliders_frame.pack_forget()
+            self.ml_sliders_frame.pack_forget()
+            self.phase_frame.pack(fill=tk.X)
+            self.request_phase_reference()
         else:
             self.classical_sliders_frame.pack_forget()
+            self.phase_frame.pack_forget()
             self.ml_sliders_frame.pack(fill=tk.X)
-            # Start YOLO thread if model is loaded
-            if self.yolo_model_loaded and self.yolo_model is not None:
-                self.start_yolo_thread()
 
     def update_status_circle(self):
         if not self.enable.get():
@@ -1376,128 +3912,611 @@ class ScreenGrabberApp:
         self.multiplier = float(self.text_entries["Multiplier"].get())
         self.scale = self.img_size / self.FOV
 
-    def segmentation_classical(self, img):
-        img_gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        
-        # Apply invert if checkbox is checked
-        if self.invert_var.get():
-            img_gray = 1 - img_gray
-            
-        img_resized = cv2.resize(img_gray, (self.img_size, self.img_size), interpolation=cv2.INTER_LINEAR)
-
-        blur_k = max(1, self.blur_var.get() // 2 * 2 + 1)
-        blurred = cv2.GaussianBlur(img_resized, (blur_k, blur_k), 0)
-
-        thresh_val = self.thresh_var.get()
-        _, binary = cv2.threshold(blurred, thresh_val, 1, cv2.THRESH_BINARY)
-
-        binary_8u = (binary * 255).astype('uint8')
-        h, w = binary_8u.shape
-        margin = self.margin_var.get()
-        flood_mask = np.zeros((h + 2, w + 2), np.uint8)
-
-        binary_8u[:margin, :] = 255
-        binary_8u[-margin:, :] = 255
-        binary_8u[:, :margin] = 255
-        binary_8u[:, -margin:] = 255
-
-        binary_copy = binary_8u.copy()
-        cv2.floodFill(binary_copy, flood_mask, seedPoint=(0, 0), newVal=128)
-
-        clean_binary = np.where(binary_copy == 255, 1, 0).astype('uint8')
-
-        contours, _ = cv2.findContours(clean_binary * 255, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-
-        area_lb = self.area_lb_var.get()
-        area_ub = self.area_ub_var.get()
-
-        filtered_contours = []
-        centroids = []
-        areas = []
-        bboxes = []
+    def start_recorder(self):
+        """Start recording processed frames for the tilt series that just began"""
+        timestamp = datetime.datetime.fromtimestamp(self.time).strftime("%Y-%m-%d_%H-%M-%S")
+        directory = os.path.join("recordings", timestamp)
+        try:
+            self.record_every_n = max(1, int(self.text_entries["Record every N"].get()))
+        except ValueError:
+            self.log(f"Invalid 'Record every N', keeping {self.record_every_n}")
+        self.recorder = FrameRecorder(directory, every_n=self.record_every_n)
+        self.log(f"Recording every {self.record_every_n} frame(s) to {directory}")
+
+    def stop_recorder(self, wait=False):
+        if self.recorder is None:
+            return
+        self.recorder.close(wait=wait)
+        self.log(f"Recording stopped: {self.recorder.written} frame(s) written, {self.recorder.dropped} dropped")
+        self.recorder = None
+        self.recorder_status_label.config(text="Recorder: Idle", foreground="gray")
+
+    def record_frame(self, frame):
+        """Hand a captured frame with its tilt index, angle and timestamp to the recorder"""
+        if self.t_counter:
+            angle = float(self.tlist[self.t_counter - 1] * 180 / np.pi)
+        else:
+            angle = float('nan')  # before the first tilt step
+        timestamp = self.frame_time if self.frame_time is not None else time.time()
+        self.recorder.submit(frame, self.t_counter, angle, timestamp)
+
+    def preprocess(self, img, invert=None):
+        """Gray conversion, downsampling, inversion and normalization at processing resolution.
+
+        The frame is resized first, so colour conversion, inversion and float scaling only touch
+        img_size x img_size pixels rather than the full grab. Returns the non-inverted gray image
+        (for display) and the working image, inverted if requested. 8-bit gray frames stay uint8;
+        BGR frames come out as float32 in [0, 1], within 0.75 gray levels of converting the whole
+        frame to float first (only the uint8 resize rounds).
+        """
+        if invert is None:
+            invert = self.invert_var.get()
+        size = (self.img_size, self.img_size)
+
+        small = cv2.resize(img, size, dst=self.get_buffer('pre_small', size + img.shape[2:], img.dtype),
+                           interpolation=cv2.INTER_LINEAR)
+        if small.ndim == 3:
+            if small.dtype == np.uint8:
+                # Convert to gray in float32, as the full-frame pipeline did, rather than rounding to uint8 first
+                small_float = self.get_buffer('pre_small_float', small.shape, 'float32')
+                np.multiply(small, np.float32(1 / 255), out=small_float)
+                small = small_float
+            gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY, dst=self.get_buffer('pre_gray', size, small.dtype))
+        else:
+            gray = small
 
-        for cnt in contours:
-            area = cv2.contourArea(cnt)
-            if area_lb <= area <= area_ub:
-                filtered_contours.append(cnt)
-                areas.append(area)
-                M = cv2.moments(cnt)
-                if M["m00"] != 0:
-                    cx = int(M["m10"] / M["m00"])
-                    cy = int(M["m01"] / M["m00"])
-                    centroids.append((cx, cy))
-                    x, y, w, h = cv2.boundingRect(cnt)
-                    bboxes.append((x, y, x + w, y + h))
+        if img.ndim == 2 and img.dtype == np.uint8:
+            img_resized = gray
+            img_work = cv2.bitwise_not(img_resized, dst=self.get_buffer('inverted', size)) if invert else img_resized
+        else:
+            if gray.dtype == np.uint8:
+                img_resized = self.get_buffer('pre_float', size, 'float32')
+                np.multiply(gray, np.float32(1 / 255), out=img_resized)
+            else:
+                img_resized = gray
+            if invert:
+                img_work = np.subtract(np.float32(1), img_resized, out=self.get_buffer('inverted_float', size, 'float32'))
+            else:
+                img_work = img_resized
 
-        largest_index = int(np.argmax(areas)) if areas else None
+        return img_resized, img_work
 
-        # Return non-inverted for display
-        display_img = 1 - img_resized if self.invert_var.get() else img_resized
+    def blur(self, img, blur_k, dst=None):
+        """Gaussian blur, switching to the constant-time box approximation for large kernels"""
+        if self.fast_blur.get() and blur_k >= self.fast_blur_min_kernel.get(img.dtype.name, 15):
+            tmp = self.get_buffer('blur_tmp', img.shape, img.dtype)
+            return box_gaussian_blur(img, blur_k, dst=dst, tmp=tmp)
+        return cv2.GaussianBlur(img, (blur_k, blur_k), 0, dst=dst)
 
+    def segmentation_classical(self, img):
+        display_img, img_work = self.preprocess(img)
+        blurred, clean_binary, filtered_contours, centroids, largest_index, bboxes = self.classical_detect(img_work)
         return display_img, clean_binary, blurred, filtered_contours, centroids, largest_index, bboxes
 
-    def segmentation_ml(self, img):
-        img_gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        img_resized = cv2.resize(img_gray, (self.img_size, self.img_size), interpolation=cv2.INTER_LINEAR)
-
-        # Send image to YOLO thread if model is loaded
-        if self.yolo_model_loaded and self.yolo_running:
-            margin = self.margin_var.get()
-            area_lb = self.area_lb_var.get()
-            area_ub = self.area_ub_var.get()
-            confidence = self.confidence_var.get()
+    def segmentation_classical_uint8(self, img_gray):
+        """Classical segmentation on a single-channel uint8 frame using preallocated buffers"""
+        # img_resized stays non-inverted for display; img_work is inverted if requested
+        img_resized, img_work = self.preprocess(img_gray)
+        blurred, clean_binary, filtered_contours, centroids, largest_index, bboxes = self.classical_detect(img_work)
+        return img_resized, clean_binary, blurred, filtered_contours, centroids, largest_index, bboxes
+
+    def classical_detect(self, img_work):
+        """Blur, threshold and find blobs, only inside the search window when one is active.
+
+        Returns full-size blurred and cleaned binary images (zero outside the window) and the
+        contours, centroids, largest index and bboxes in processing coordinates.
+        """
+        h, w = img_work.shape
+        is_uint8 = img_work.dtype == np.uint8
+        blur_k = max(1, self.blur_var.get() // 2 * 2 + 1)
+        window = self.get_search_window(h, w)
 
-            # Clear old input and add new one
-            while not self.yolo_input_queue.empty():
-                try:
-                    self.yolo_input_queue.get_nowait()
-                except queue.Empty:
-                    break
-            
-            try:
-                self.yolo_input_queue.put_nowait((img_resized.copy(), margin, area_lb, area_ub, confidence))
-            except queue.Full:
-                pass
+        blurred = self.get_buffer('blurred', (h, w), img_work.dtype)
+        while True:
+            if window is None:
+                x0, y0, x1, y1 = 0, 0, w, h
+                region = self.blur(img_work, blur_k, dst=blurred)
+            else:
+                x0, y0, x1, y1 = window
+                # Blur with blur_k // 2 pixels of context so the window matches a full-frame blur
+                pad = blur_k // 2
+                px0, py0 = max(x0 - pad, 0), max(y0 - pad, 0)
+                px1, py1 = min(x1 + pad, w), min(y1 + pad, h)
+                padded = self.blur(img_work[py0:py1, px0:px1], blur_k)
+                region = padded[y0 - py0:y1 - py0, x0 - px0:x1 - px0]
+                blurred.fill(0)
+                blurred[y0:y1, x0:x1] = region
+
+            binary = self.get_buffer('binary', region.shape)
+            if is_uint8:
+                cv2.threshold(region, self.thresh_var.get() * 255, 255, cv2.THRESH_BINARY, dst=binary)
+            else:
+                _, binary_f = cv2.threshold(region, self.thresh_var.get(), 255, cv2.THRESH_BINARY)
+                np.copyto(binary, binary_f, casting='unsafe')
+
+            # The float pipeline displays its binary as 0/1
+            clean_binary, contours, centroids, largest_index, bboxes, clipped = self.detect_blobs(
+                binary, fg=255 if is_uint8 else 1, offset=(x0, y0), frame_shape=(h, w),
+                target=self.search_state[:2] if window is not None else None)
+            if window is None or not clipped:
+                break
+            # The blob nearest the prediction is cut by the window edge: search this frame once more, in full
+            window = None
+
+        if window is not None:
+            clean_full = self.get_buffer('clean_binary_full', (h, w))
+            clean_full.fill(0)
+            clean_full[y0:y1, x0:x1] = clean_binary
+            clean_binary = clean_full
+
+        self.search_window_active = window
+        return blurred, clean_binary, contours, centroids, largest_index, bboxes
+
+    def update_tracker(self, centroids, largest_index, timestamp=None):
+        """Feed detections to the Kalman tracker and return the detection index of the locked target.
+
+        timestamp is when the detections' source frame was captured, by default the current frame.
+        """
+        # Track positions are meaningless across sources, methods and processing sizes
+        key = (self.capture_source.get(), self.tracking_method.get(), self.img_size)
+        if key != self.tracker_key:
+            self.tracker.reset()
+            self.tracker_key = key
+        self.tracker.gate = 0.1 * self.img_size
+        if timestamp is None:
+            timestamp = self.frame_time if self.frame_time is not None else time.time()
+        return self.tracker.update(centroids, largest_index, timestamp)
+
+    def get_search_window(self, h, w):
+        """Window (x0, y0, x1, y1) around the predicted target position, or None for a full-frame search"""
+        if not self.window_search.get():
+            self.search_state = None
+            return None
+        if self.search_state is None:
+            return None
+
+        cx, cy, half = self.search_state
+        x0, y0 = max(int(cx - half), 0), max(int(cy - half), 0)
+        x1, y1 = min(int(cx + half), w), min(int(cy + half), h)
+        if x1 - x0 < 2 or y1 - y0 < 2 or (x0 == 0 and y0 == 0 and x1 == w and y1 == h):
+            return None
+        return x0, y0, x1, y1
+
+    def update_search_window(self, centroids, largest_index, bboxes):
+        """Re-center the search window on the tracked target, growing it when the target is lost"""
+        if not self.window_search.get():
+            return
+        window = self.search_window_active
 
-        # Get latest result from YOLO thread
+        if largest_index is not None:
+            cx, cy = centroids[largest_index]
+            if self.search_last_pos is not None:
+                vx, vy = cx - self.search_last_pos[0], cy - self.search_last_pos[1]
+            else:
+                vx, vy = 0, 0
+            self.search_last_pos = (cx, cy)
+
+            # Predict one frame ahead and leave room for the particle plus twice its last step
+            x1, y1, x2, y2 = bboxes[largest_index]
+            half = max(x2 - x1, y2 - y1) + 2 * max(abs(vx), abs(vy))
+            # Round up to 16 px so the window size, and its buffers, change rarely
+            half = max(self.search_window_min, -(-half // 16) * 16)
+            self.search_state = (cx + vx, cy + vy, half)
+        elif window is not None:
+            # Lost inside the window: double it around the same prediction, then fall back to full frame
+            cx, cy, half = self.search_state
+            half *= 2
+            self.search_state = (cx, cy, half) if 2 * half < self.img_size else None
+            self.search_last_pos = None
+        else:
+            self.search_state = None
+            self.search_last_pos = None
+
+    def detect_blobs(self, binary, fg=255, offset=(0, 0), frame_shape=None, target=None):
+        """Find blobs in a binary image, dropping those inside the margin band or outside the area bounds.
+
+        Areas, centroids and bboxes of every blob come from one connectedComponentsWithStats
+        call and are filtered as arrays; contours are traced only for the blobs that are kept.
+        When binary is a window of the frame at offset, the margin band is measured from the
+        edges of the frame (frame_shape) rather than the window. Returns the border-cleaned
+        binary (blobs set to fg), contours, centroids, the index of the largest blob and bboxes
+        in frame coordinates, and whether the sizeable blob nearest the predicted target
+        position (frame coordinates) is cut by an edge of the window.
+        """
+        h, w = binary.shape
+        fh, fw = frame_shape if frame_shape is not None else (h, w)
+        ox, oy = offset
+        labels = self.get_buffer('labels', (h, w), 'int32')
+        # Grana's block-based labelling is several times faster than the default here on sparse frames
+        n, labels, stats, cc_centroids = cv2.connectedComponentsWithStatsWithAlgorithm(
+            binary, 8, cv2.CV_32S, cv2.CCL_GRANA, labels=labels)
+
+        # Row 0 is the background
+        x = stats[1:, cv2.CC_STAT_LEFT]
+        y = stats[1:, cv2.CC_STAT_TOP]
+        bw = stats[1:, cv2.CC_STAT_WIDTH]
+        bh = stats[1:, cv2.CC_STAT_HEIGHT]
+        areas = stats[1:, cv2.CC_STAT_AREA]
+
+        # Blobs reaching into the margin band are treated as cut off by the frame edge
+        band = max(self.margin_var.get(), 1)
+        inside = (x + ox >= band) & (y + oy >= band) & (x + ox + bw <= fw - band) & (y + oy + bh <= fh - band)
+        keep = inside & (areas >= self.area_lb_var.get()) & (areas <= self.area_ub_var.get())
+        # The target is only partly seen if the blob nearest its prediction touches a window edge
+        # that lies inside the frame
+        clipped = False
+        candidates = np.flatnonzero(inside & (areas >= self.area_lb_var.get() / 4))
+        if target is not None and len(candidates):
+            dx = cc_centroids[candidates + 1, 0] + ox - target[0]
+            dy = cc_centroids[candidates + 1, 1] + oy - target[1]
+            i = candidates[np.argmin(np.hypot(dx, dy))]
+            clipped = bool(((x[i] == 0) & (ox > 0)) | ((y[i] == 0) & (oy > 0))
+                           | ((x[i] + bw[i] == w) & (ox + w < fw)) | ((y[i] + bh[i] == h) & (oy + h < fh)))
+
+        # Erase the rejected border blobs from the displayed binary with one lookup through the labels
+        clean_binary = self.get_buffer('clean_binary', (h, w))
+        if inside.all():
+            cv2.threshold(binary, 0, fg, cv2.THRESH_BINARY, dst=clean_binary)
+        else:
+            lut = np.zeros(n, dtype=np.uint8)
+            lut[1:][inside] = fg
+            np.take(lut, labels, out=clean_binary)
+
+        kept = np.flatnonzero(keep)
+        contours = []
+        for i in kept:
+            x0, y0, x1, y1 = x[i], y[i], x[i] + bw[i], y[i] + bh[i]
+            mask = (labels[y0:y1, x0:x1] == i + 1).view(np.uint8)
+            blob_contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE,
+                                                offset=(int(x0) + ox, int(y0) + oy))
+            contours.append(max(blob_contours, key=len))
+
+        centroids = [(cx + ox, cy + oy) for cx, cy in cc_centroids[kept + 1].astype(int).tolist()]
+        corners = np.stack([x[kept] + ox, y[kept] + oy, x[kept] + bw[kept] + ox, y[kept] + bh[kept] + oy], axis=1)
+        bboxes = [tuple(b) for b in corners.tolist()]
+        largest_index = int(np.argmax(areas[kept])) if len(kept) else None
+
+        return clean_binary, contours, centroids, largest_index, bboxes, clipped
+
+    def cascade_detection_due(self):
+        """Whether the cascade should hand the current frame to YOLO"""
+        self.cascade_frames += 1
+        # Wait for the pending detection, unless it was lost (worker restarted or stopped)
+        if self.cascade_submit_time is not None and time.time() - self.cascade_submit_time < 2.0:
+            return False
+        return (self.cascade_tracker.template is None
+                or self.cascade_tracker.score < self.yolo_cascade_min_score
+                or self.cascade_frames >= self.yolo_cascade_every)
+
+    def update_cascade(self, img_resized, centroids, bboxes, largest_index):
+        """Replace the target's YOLO box with the template tracker's box for this frame"""
+        bbox, score = self.cascade_tracker.update(img_resized)
+        centroids, bboxes = list(centroids), list(bboxes)
+        if bbox is None or score < self.yolo_cascade_min_score:
+            # Lost until YOLO re-detects; drop the target rather than steer by a stale box
+            del centroids[largest_index], bboxes[largest_index]
+            return centroids, bboxes, None
+        x1, y1, x2, y2 = bbox
+        centroids[largest_index] = ((x1 + x2) // 2, (y1 + y2) // 2)
+        bboxes[largest_index] = bbox
+        return centroids, bboxes, largest_index
+
+    def get_yolo_roi_hint(self):
+        """Bbox of the current target for ROI inference, or None to request a full-frame pass"""
+        if not self.yolo_roi.get():
+            return None
+        _, centroids, largest_index, bboxes = self.processed_result
+        if largest_index is None or largest_index >= len(bboxes):
+            return None
+        return bboxes[largest_index]
+
+    def get_yolo_roi(self, hint):
+        """Square crop (x0, y0, side) around the hinted bbox, or None when a full-frame pass is due"""
+        self.yolo_roi_count += 1
+        if hint is None or self.yolo_roi_lost or self.yolo_roi_count % self.yolo_roi_full_every == 0:
+            return None
+
+        x1, y1, x2, y2 = hint
+        side = max(x2 - x1, y2 - y1) * self.yolo_roi_scale
+        # Multiples of 32 match the YOLO stride
+        side = max(self.yolo_roi_min, -(-side // 32) * 32)
+        if side >= self.img_size:
+            return None
+        # Shift rather than clip at the frame edges so the crop stays square
+        x0 = min(max((x1 + x2) // 2 - side // 2, 0), self.img_size - side)
+        y0 = min(max((y1 + y2) // 2 - side // 2, 0), self.img_size - side)
+        return x0, y0, side
+
+    def segmentation_ml(self, img, submit=True):
+        size = (self.img_size, self.img_size)
+        img_resized, _ = self.preprocess(img, invert=False)
+        cascade = self.yolo_cascade.get()
+        worker = self.yolo_worker
+
+        # Collect the newest result first: its frame lives in a slot the next submit may reuse
         filtered_contours = []
         centroids = []
         bboxes = []
         largest_index = None
 
-        try:
-            result = self.yolo_output_queue.get_nowait()
-            filtered_contours, centroids, bboxes, largest_index = result
-            self.latest_yolo_result = result
-        except queue.Empty:
+        result = worker.take_result() if worker is not None and worker.poll() else None
+        if result is not None:
+            yolo_frame, detections, source_seq, source_time = result
+            # Age of the detection's source frame, from capture to now
+            self.yolo_latency_ms = (time.time() - source_time) * 1000 if source_time is not None else 0.0
+            self.yolo_latency_frames = self.frame_seq - source_seq
+            self.yolo_source_time = source_time
+            # Boxes are drawn directly, so no contour polygons are built
+            results = []
+            for boxes, index in detections:
+                boxes = [tuple(box) for box in boxes.tolist()]
+                results.append(([((x1 + x2) // 2, (y1 + y2) // 2) for x1, y1, x2, y2 in boxes], boxes, index))
+            centroids, bboxes, largest_index = results[0]
+            # Further entries are the extra multi-ROI regions submitted with this frame
+            self.multi_roi_results = results[1:]
+            self.latest_yolo_result = (filtered_contours, centroids, bboxes, largest_index)
+            self.yolo_roi_lost = largest_index is None
+            self.cascade_submit_time = None
+            if cascade:
+                # Seed the tracker on the frame YOLO saw; update() below carries it to this frame
+                if largest_index is not None:
+                    if img_resized.dtype != np.uint8:
+                        yolo_frame = yolo_frame.astype(np.float32) / 255
+                    self.cascade_tracker.seed(yolo_frame, bboxes[largest_index])
+                else:
+                    self.cascade_tracker.template = None
+
+            # Update YOLO FPS
+            self.yolo_frame_count += 1
+            now = time.time()
+            if now - self.yolo_last_time >= 1.0:
+                self.yolo_fps = self.yolo_frame_count / (now - self.yolo_last_time)
+                self.yolo_last_time = now
+                self.yolo_frame_count = 0
+        elif self.latest_yolo_result is not None:
             # Use cached result if available
-            if self.latest_yolo_result is not None:
-                filtered_contours, centroids, bboxes, largest_index = self.latest_yolo_result
+            filtered_contours, centroids, bboxes, largest_index = self.latest_yolo_result
+
+        # Send image to the inference process; in cascade mode only when a detection is due
+        if submit and worker is not None and worker.ready and (not cascade or self.cascade_detection_due()):
+            worker.set_params(self.margin_var.get(), self.area_lb_var.get(), self.area_ub_var.get(),
+                              self.confidence_var.get(), self.yolo_class_ids)
+            roi = self.get_yolo_roi(self.get_yolo_roi_hint())
+            # Extra multi-ROI regions ride along in the same batch
+            imgs = [img_resized] + (list(self.multi_roi_frames) if self.multi_roi_frames is not None else [])
+            if worker.submit(imgs, roi, self.frame_seq, self.frame_time):
+                self.cascade_frames = 0
+                self.cascade_submit_time = time.time()
+
+        if cascade and largest_index is not None:
+            centroids, bboxes, largest_index = self.update_cascade(img_resized, centroids, bboxes, largest_index)
 
         # Create placeholder binary and blurred images
-        binary = np.zeros((self.img_size, self.img_size), dtype='uint8')
-        blurred = img_resized.copy()
+        if img_resized.dtype == np.uint8:
+            binary = self.get_buffer('ml_binary', size)
+            binary.fill(0)
+            blurred = img_resized
+        else:
+            binary = np.zeros(size, dtype='uint8')
+            blurred = img_resized.copy()
 
         return img_resized, binary, blurred, filtered_contours, centroids, largest_index, bboxes
 
-    def segmentation(self, img):
+    def request_phase_reference(self):
+        """Take the next processed frame as the phase-correlation reference"""
+        self.phase_reference_requested = True
+
+    def capture_phase_reference(self):
+        """Make the frame just processed the phase-correlation reference, e.g. right before a tilt step"""
+        if self.tracking_method.get() == 'phase':
+            self.phase.set_reference()
+
+    def segmentation_phase(self, img):
+        """Track drift of the whole field by phase correlation, reported as a single pseudo-particle.
+
+        The pseudo-particle sits at the frame center shifted by the measured drift, so the usual
+        transVec path moves the stage to bring the view back onto the reference.
+        """
+        img_resized, _ = self.preprocess(img, invert=False)
+
+        key = (self.capture_source.get(), self.img_size)
+        if key != self.phase_key:
+            self.phase_key = key
+            self.phase_reference_requested = True
+
+        dx, dy, response = self.phase.estimate(img_resized)
+        if self.phase_reference_requested:
+            self.phase.set_reference()
+            self.phase_reference_requested = False
+            dx, dy, response = 0.0, 0.0, 1.0
+
+        # Correlation surface, shifted so zero drift is in the middle, as the binary panel
+        surface = np.fft.fftshift(self.phase.surface)
+        surface = cv2.normalize(surface, None, 0, 255 if self.uint8_pipeline.get() else 1, cv2.NORM_MINMAX,
+                                dtype=cv2.CV_8U if self.uint8_pipeline.get() else cv2.CV_32F)
+
+        self.phase_status_label.config(text=f"Peak: {response:.2f}",
+                                       foreground="green" if response >= self.phase_min_response else "red")
+        if response < self.phase_min_response:
+            return img_resized, surface, img_resized, [], [], None, []
+
+        center = self.img_size / 2
+        cx, cy = int(round(center + dx)), int(round(center + dy))
+        half = self.img_size // 4
+        return img_resized, surface, img_resized, [], [(cx, cy)], 0, [(cx - half, cy - half, cx + half, cy + half)]
+
+    def segmentation(self, img, submit=True):
         if self.tracking_method.get() == 'ml':
-            return self.segmentation_ml(img)
+            return self.segmentation_ml(img, submit)
+        elif self.tracking_method.get() == 'phase':
+            return self.segmentation_phase(img)
+        elif img.ndim == 2 and img.dtype == np.uint8:
+            return self.segmentation_classical_uint8(img)
         else:
             return self.segmentation_classical(img)
 
+    def get_multi_rois(self, img):
+        """Regions of the frame for multi-ROI mode, or None when it is off or the spec is invalid"""
+        if not self.multi_roi.get():
+            return None
+        h, w = img.shape[:2]
+        try:
+            rois = parse_roi_spec(self.multi_roi_spec.get(), w, h)[:self.multi_roi_max]
+        except ValueError as e:
+            # Log a bad spec once, not every tick while it is being typed
+            if str(e) != self.multi_roi_error:
+                self.log(f"Multi-ROI disabled: {e}")
+                self.multi_roi_error = str(e)
+            return None
+        self.multi_roi_error = None
+        return rois
+
+    def get_multi_roi_count(self):
+        """Number of regions in the multi-ROI spec, or 1 when multi-ROI is off or the spec is invalid"""
+        if not self.multi_roi.get():
+            return 1
+        try:
+            # Rectangles are only clipped by the frame, so a frame larger than any screen gives the count
+            return len(parse_roi_spec(self.multi_roi_spec.get(), 1 << 16, 1 << 16)[:self.multi_roi_max])
+        except ValueError:
+            return 1
+
+    def preprocess_rois(self, img, rois):
+        """Resize and gray-convert regions of the frame into one (n, img_size, img_size) stack.
+
+        Matches preprocess(): uint8 for 8-bit gray frames, float32 in [0, 1] otherwise.
+        """
+        size = (self.img_size, self.img_size)
+        is_uint8 = img.ndim == 2 and img.dtype == np.uint8
+        stack = self.get_buffer('roi_stack', (len(rois),) + size, 'uint8' if is_uint8 else 'float32')
+        for i, (x, y, w, h) in enumerate(rois):
+            if is_uint8:
+                cv2.resize(img[y:y + h, x:x + w], size, dst=stack[i], interpolation=cv2.INTER_LINEAR)
+                continue
+            small = cv2.resize(img[y:y + h, x:x + w], size, interpolation=cv2.INTER_LINEAR)
+            if small.ndim == 3:
+                small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+            if small.dtype == np.uint8:
+                np.multiply(small, np.float32(1 / 255), out=stack[i])
+            else:
+                stack[i] = small
+        return stack
+
+    def detect_rois_classical(self, stack):
+        """Classical detection on a stack of regions with one blur, threshold and labelling call.
+
+        The regions are laid out one above the other, separated by blank bands wider than the
+        blur kernel plus the margin, so nothing bleeds or connects across regions and each blob
+        can be assigned to its region by row. Returns (centroids, bboxes, largest_index) per region.
+        """
+        n, h, w = stack.shape
+        is_uint8 = stack.dtype == np.uint8
+        blur_k = max(1, self.blur_var.get() // 2 * 2 + 1)
+        band = max(self.margin_var.get(), 1)
+        stride = h + blur_k + band
+
+        tall = self.get_buffer('roi_tall', (n * stride - stride + h, w), stack.dtype)
+        tall.fill(0)
+        invert = self.invert_var.get()
+        for i in range(n):
+            rows = tall[i * stride:i * stride + h]
+            if not invert:
+                rows[:] = stack[i]
+            elif is_uint8:
+                cv2.bitwise_not(stack[i], dst=rows)
+            else:
+                np.subtract(np.float32(1), stack[i], out=rows)
+
+        blurred = self.blur(tall, blur_k, dst=self.get_buffer('roi_blurred', tall.shape, tall.dtype))
+        binary = self.get_buffer('roi_binary', tall.shape)
+        if is_uint8:
+            cv2.threshold(blurred, self.thresh_var.get() * 255, 255, cv2.THRESH_BINARY, dst=binary)
+        else:
+            _, binary_f = cv2.threshold(blurred, self.thresh_var.get(), 255, cv2.THRESH_BINARY)
+            np.copyto(binary, binary_f, casting='unsafe')
+
+        _, _, stats, cc_centroids = cv2.connectedComponentsWithStatsWithAlgorithm(
+            binary, 8, cv2.CV_32S, cv2.CCL_GRANA, labels=self.get_buffer('roi_labels', tall.shape, 'int32'))
+        x, y, bw, bh, areas = (stats[1:, i] for i in (cv2.CC_STAT_LEFT, cv2.CC_STAT_TOP, cv2.CC_STAT_WIDTH,
+                                                       cv2.CC_STAT_HEIGHT, cv2.CC_STAT_AREA))
+        region = y // stride
+        y = y - region * stride
+        keep = ((x >= band) & (y >= band) & (x + bw <= w - band) & (y + bh <= h - band)
+                & (areas >= self.area_lb_var.get()) & (areas <= self.area_ub_var.get()))
+        centers = cc_centroids[1:].astype(int)
+        centers[:, 1] -= region * stride
+
+        results = []
+        for i in range(n):
+            kept = np.flatnonzero(keep & (region == i))
+            centroids = [tuple(c) for c in centers[kept].tolist()]
+            corners = np.stack([x[kept], y[kept], x[kept] + bw[kept], y[kept] + bh[kept]], axis=1)
+            bboxes = [tuple(b) for b in corners.tolist()]
+            largest_index = int(np.argmax(areas[kept])) if len(kept) else None
+            results.append((centroids, bboxes, largest_index))
+        return results
+
+    def get_multi_roi_overview(self, img, rois, results):
+        """Whole frame with every region, its detections and its target drawn, for the first panel"""
+        display = (self.display_size, self.display_size)
+        small = cv2.resize(img, display, interpolation=cv2.INTER_AREA)
+        if small.dtype != np.uint8:
+            small = (small * 255).astype('uint8')
+        overview = cv2.cvtColor(small, cv2.COLOR_GRAY2RGB) if small.ndim == 2 else cv2.cvtColor(
+            small, cv2.COLOR_BGR2RGB)
+        frame_h, frame_w = img.shape[:2]
+        sx, sy = self.display_size / frame_w, self.display_size / frame_h
+
+        for n, ((x, y, w, h), (centroids, bboxes, largest_index)) in enumerate(zip(rois, results)):
+            # Processing coordinates of the region -> frame -> display
+            kx, ky = w / self.img_size, h / self.img_size
+            cv2.rectangle(overview, (int(x * sx), int(y * sy)), (int((x + w) * sx) - 1, int((y + h) * sy) - 1),
+                          (255, 255, 0), 1)
+            cv2.putText(overview, str(n + 1), (int(x * sx) + 3, int(y * sy) + 12), cv2.FONT_HERSHEY_SIMPLEX,
+                        0.4, (255, 255, 0), 1)
+            for i, ((cx, cy), (x1, y1, x2, y2)) in enumerate(zip(centroids, bboxes)):
+                color = (255, 127, 0) if i == largest_index else (0, 255, 0)
+                cv2.rectangle(overview, (int((x + x1 * kx) * sx), int((y + y1 * ky) * sy)),
+                              (int((x + x2 * kx) * sx), int((y + y2 * ky) * sy)), color, 1)
+                if i == largest_index:
+                    cv2.circle(overview, (int((x + cx * kx) * sx), int((y + cy * ky) * sy)), 2, (255, 0, 0), -1)
+        return overview
+
+    def update_multi_roi_label(self, results):
+        """Target position of each extra region, in its processing coordinates"""
+        parts = []
+        for n, (centroids, _, largest_index) in enumerate(results, start=2):
+            if largest_index is None:
+                parts.append(f"ROI {n}: (—, —)")
+            else:
+                cx, cy = centroids[largest_index]
+                parts.append(f"ROI {n}: ({cx}, {cy})")
+        self.multi_roi_label.config(text=" | ".join(parts))
+
     def get_img_display(self, img_resized):
-        return (cv2.resize(img_resized, (self.display_size, self.display_size),
-                           interpolation=cv2.INTER_LINEAR) * 255).astype('uint8')
+        display = (self.display_size, self.display_size)
+        if img_resized.dtype == np.uint8:
+            return cv2.resize(img_resized, display, dst=self.get_buffer('display', display),
+                              interpolation=cv2.INTER_LINEAR)
+        return (cv2.resize(img_resized, display, interpolation=cv2.INTER_LINEAR) * 255).astype('uint8')
 
     def get_img_blur_display(self, img_blur):
-        return (cv2.resize(img_blur, (self.display_size, self.display_size),
-                           interpolation=cv2.INTER_LINEAR) * 255).astype('uint8')
+        display = (self.display_size, self.display_size)
+        if img_blur.dtype == np.uint8:
+            return cv2.resize(img_blur, display, dst=self.get_buffer('blur_display', display),
+                              interpolation=cv2.INTER_LINEAR)
+        return (cv2.resize(img_blur, display, interpolation=cv2.INTER_LINEAR) * 255).astype('uint8')
 
     def get_img_bw_display_rgb(self, img_bw):
-        img_bw_display = (cv2.resize(img_bw, (self.display_size, self.display_size),
-                                     interpolation=cv2.INTER_LINEAR) * 255).astype('uint8')
-        img_bw_display_bgr = cv2.cvtColor(img_bw_display, cv2.COLOR_GRAY2BGR)
+        display = (self.display_size, self.display_size)
+        if self.uint8_pipeline.get():
+            # 8-bit pipeline binaries are already 0/255
+            img_bw_display = cv2.resize(img_bw, display, dst=self.get_buffer('bw_display', display),
+                                        interpolation=cv2.INTER_LINEAR)
+        else:
+            img_bw_display = (cv2.resize(img_bw, display, interpolation=cv2.INTER_LINEAR) * 255).astype('uint8')
+        img_bw_display_bgr = cv2.cvtColor(img_bw_display, cv2.COLOR_GRAY2BGR,
+                                          dst=self.get_buffer('bw_display_bgr', display + (3,)))
 
         margin = self.margin_var.get()
         scaled_margin = int(margin * self.display_size / self.img_size)
@@ -1520,14 +4539,17 @@ class ScreenGrabberApp:
         draw_centered_box(img_bw_display_bgr, cx, cy, lb_len, (0, 255, 0))
         draw_centered_box(img_bw_display_bgr, cx, cy, ub_len, (255, 0, 0))
 
-        return cv2.cvtColor(img_bw_display_bgr, cv2.COLOR_BGR2RGB)
+        return cv2.cvtColor(img_bw_display_bgr, cv2.COLOR_BGR2RGB,
+                            dst=self.get_buffer('bw_display_rgb', display + (3,)))
 
     def get_img_overlay_rgb(self, img_display, contours, centroids, largest_index, bboxes):
-        img_overlay = cv2.cvtColor(img_display.copy(), cv2.COLOR_GRAY2BGR)
+        display = (self.display_size, self.display_size)
+        img_overlay = cv2.cvtColor(img_display, cv2.COLOR_GRAY2BGR,
+                                   dst=self.get_buffer('overlay_bgr', display + (3,)))
         scale_x = self.display_size / self.img_size
         scale_y = self.display_size / self.img_size
 
-        use_bbox = self.tracking_method.get() == 'ml'
+        use_bbox = self.tracking_method.get() != 'classical'
 
         for i, (centroid, bbox) in enumerate(zip(centroids, bboxes)):
             cx, cy = centroid
@@ -1558,29 +4580,117 @@ class ScreenGrabberApp:
 
             cv2.circle(img_overlay, (cx_disp, cy_disp), 3, centroid_color, -1)
 
-        return cv2.cvtColor(img_overlay, cv2.COLOR_BGR2RGB)
+        return cv2.cvtColor(img_overlay, cv2.COLOR_BGR2RGB,
+                            dst=self.get_buffer('overlay_rgb', display + (3,)))
+
+    def check_frame_changed(self, img):
+        """Compare a downsampled thumbnail against the last changed frame's thumbnail"""
+        size = (self.dedup_size, self.dedup_size)
+        thumb = cv2.resize(img, size, dst=self.get_buffer('thumb_new', size + img.shape[2:], img.dtype),
+                           interpolation=cv2.INTER_AREA)
+        last = self.buffers.get('thumb_last')
+        if (last is not None and last.shape == thumb.shape and last.dtype == thumb.dtype
+                and cv2.norm(thumb, last, cv2.NORM_L1) <= self.dedup_tolerance * thumb.size):
+            return False
+
+        # Only a changed frame becomes the new reference, so slow drift still adds up past the tolerance
+        self.buffers['thumb_last'], self.buffers['thumb_new'] = thumb, last
+        return True
+
+    def get_tracking_params(self):
+        """Snapshot of every setting that affects segmentation and the rendered panels"""
+        return (self.tracking_method.get(), self.uint8_pipeline.get(), self.blur_var.get(), self.fast_blur.get(),
+                self.window_search.get(), self.thresh_var.get(), self.invert_var.get(), self.margin_var.get(),
+                self.area_lb_var.get(), self.area_ub_var.get(), self.confidence_var.get(), self.yolo_classes.get(),
+                self.img_size, self.display_size, self.multi_roi.get(), self.multi_roi_spec.get())
 
     def update_image(self):
+        redraw = True
         try:
             # Get frame from selected capture source
             img_np = self.get_capture_frame()
-            
-            # Convert to float32 for processing
-            img_np = img_np.astype('float32') / 255
-
-            img_resized, img_bw, img_blur, contours, centroids, largest_index, bboxes = self.segmentation(img_np)
-
-            img_display = self.get_img_display(img_resized)
-            img_blur_display = self.get_img_blur_display(img_blur)
-            img_bw_display_rgb = self.get_img_bw_display_rgb(img_bw)
-            img_overlay_rgb = self.get_img_overlay_rgb(img_display, contours, centroids, largest_index, bboxes)
-
-            self.im1.set_data(img_display)
-            self.im2.set_data(img_blur_display)
-            self.im3.set_data(img_bw_display_rgb)
-            self.im4.set_data(img_overlay_rgb)
-
-            if largest_index is not None:
+            frame_key = (self.capture_source.get(), self.frame_seq)
+            params = self.get_tracking_params()
+            rois = self.get_multi_rois(img_np)
+
+            # A repeated sequence number is always the same frame; otherwise compare content
+            if not self.skip_unchanged.get():
+                frame_changed = True
+            elif frame_key == self.processed_frame_key:
+                frame_changed = False
+            else:
+                frame_changed = self.check_frame_changed(img_np)
+            self.processed_frame_key = frame_key
+
+            # Any tracking parameter change invalidates the cached result
+            stale = frame_changed or params != self.processed_params
+            ml_result_pending = (self.tracking_method.get() == 'ml' and self.yolo_worker is not None
+                                 and self.yolo_worker.poll())
+
+            if not stale and not ml_result_pending:
+                # Same frame and settings as last tick: keep the rendered panels and detections
+                contours, centroids, largest_index, bboxes = self.processed_result
+                redraw = False
+            else:
+                if self.recorder is not None and frame_changed:
+                    self.record_frame(img_np)
+
+                # In multi-ROI mode the first region is tracked as the frame; the others are stacked for
+                # one batched pass, by the classical detector here or with the YOLO submission
+                img_primary = img_np
+                self.multi_roi_frames = None
+                if rois is not None:
+                    x, y, w, h = rois[0]
+                    img_primary = img_np[y:y + h, x:x + w]
+                    if len(rois) > 1 and self.tracking_method.get() != 'phase':
+                        self.multi_roi_frames = self.preprocess_rois(img_np, rois[1:])
+
+                # An unchanged frame only needs re-rendering for a new YOLO result, not another inference
+                img_resized, img_bw, img_blur, contours, centroids, largest_index, bboxes = self.segmentation(
+                    img_primary, submit=stale)
+                if self.multi_roi_frames is None:
+                    self.multi_roi_results = []
+                elif self.tracking_method.get() == 'classical':
+                    self.multi_roi_results = self.detect_rois_classical(self.multi_roi_frames)
+
+                # Repeated YOLO results carry no new measurement for the tracker, unless the cascade moved them
+                if self.target_lock.get() and (self.tracking_method.get() != 'ml' or ml_result_pending
+                                               or self.yolo_cascade.get()):
+                    # A fresh YOLO result describes its source frame, captured the inference latency ago
+                    ml_direct = ml_result_pending and not self.yolo_cascade.get()
+                    largest_index = self.update_tracker(centroids, largest_index,
+                                                        self.yolo_source_time if ml_direct else None)
+                    if ml_direct and self.latest_yolo_result is not None:
+                        # Repeats of this result until the next one keep highlighting the locked target
+                        self.latest_yolo_result = self.latest_yolo_result[:3] + (largest_index,)
+                if self.tracking_method.get() == 'classical':
+                    self.update_search_window(centroids, largest_index, bboxes)
+
+                img_display = self.get_img_display(img_resized)
+                img_blur_display = self.get_img_blur_display(img_blur)
+                img_bw_display_rgb = self.get_img_bw_display_rgb(img_bw)
+                img_overlay_rgb = self.get_img_overlay_rgb(img_display, contours, centroids, largest_index, bboxes)
+
+                self.im1.set_data(img_display)
+                self.im2.set_data(img_blur_display)
+                self.im3.set_data(img_bw_display_rgb)
+                self.im4.set_data(img_overlay_rgb)
+                if rois is not None:
+                    self.im1.set_data(self.get_multi_roi_overview(
+                        img_np, rois, [(centroids, bboxes, largest_index)] + self.multi_roi_results))
+                self.update_multi_roi_label(self.multi_roi_results)
+
+                self.processed_params = params
+                self.processed_result = (contours, centroids, largest_index, bboxes)
+
+            target = self.tracker.target_position(time.time()) if self.target_lock.get() else None
+            if target is not None:
+                # Kalman estimate extrapolated over the capture-to-now latency
+                center = np.array([self.img_size / 2, self.img_size / 2])
+                transVec = center - target
+                self.obj_pos_label.config(
+                    text=f"Target #{self.tracker.target_id} @ (x, y): ({target[0]:.0f}, {target[1]:.0f}) of {self.img_size}")
+            elif largest_index is not None and not self.target_lock.get():
                 cx, cy = centroids[largest_index]
                 center = np.array([self.img_size / 2, self.img_size / 2])
                 transVec = center - np.array([cx, cy])
@@ -1588,10 +4698,16 @@ class ScreenGrabberApp:
             else:
                 transVec = np.array([0, 0])
                 self.obj_pos_label.config(text=f"Object @ (x, y): (—, —) of {self.img_size}")
+            # The tracked image (the frame, or region 1 in multi-ROI mode) was stretched to a square;
+            # express the move in full-frame processing pixels along x, which FOV is measured across
+            frame_h, frame_w = img_np.shape[:2]
+            _, _, roi_w, roi_h = rois[0] if rois is not None else (0, 0, frame_w, frame_h)
+            transVec = transVec * np.array([roi_w / frame_w, roi_h / frame_w])
 
             # Update YOLO FPS label
             if self.tracking_method.get() == 'ml':
-                self.yolo_fps_label.config(text=f"YOLO FPS: {self.yolo_fps:.1f}")
+                self.yolo_fps_label.config(text=f"YOLO FPS: {self.yolo_fps:.1f}  Age: {self.yolo_latency_ms:.0f} ms"
+                                                    f" / {self.yolo_latency_frames} frames")
 
             # Microscopy control logic
             if (not self.tilt_status) and self.tilt_trigger:
@@ -1605,6 +4721,9 @@ class ScreenGrabberApp:
                 self.time = time.time()
                 self.last_tilt_time = time.time()
                 self.logs = []
+                self.capture_phase_reference()
+                if self.record_frames.get():
+                    self.start_recorder()
                 self.update_tracking_status_label()
             elif self.tilt_status and self.tilt_trigger:
                 self.para_sync()
@@ -1631,6 +4750,8 @@ class ScreenGrabberApp:
                     self.last_tilt_time = time.time()
                     self.log(
                         f"[{(self.last_tilt_time - self.time):.2f}] Going to the next tilt angle: {np.round((self.tlist[self.t_counter] * 180 / np.pi * 100)) / 100}")
+                    # The view was re-centered during this step, so it is the reference for the next one
+                    self.capture_phase_reference()
                     if self.enable.get() and self.connected and self.M is not None:
                         self.M.set_stage_position({'a': self.tlist[self.t_counter]})
                     self.logs.append(np.array(
@@ -1645,6 +4766,7 @@ class ScreenGrabberApp:
                 self.tilt_status = False
                 self.tlist = None
                 self.t_counter = None
+                self.stop_recorder()
                 self.update_tracking_status_label()
             elif (not self.tilt_status) and (not self.tilt_trigger):
                 pass
@@ -1652,28 +4774,159 @@ class ScreenGrabberApp:
         except Exception as e:
             self.log(f"Error: {e}")
 
-        self.canvas.draw()
+        if redraw:
+            self.canvas.draw()
 
         self.frame_count += 1
         now = time.time()
         if now - self.last_time >= 1.0:
             fps = self.frame_count / (now - self.last_time)
             self.fps_label.config(text=f"FPS: {fps:.1f}")
+            if self.capture_card_running and self.capture_card_ring is not None:
+                width, height = self.capture_card_size
+                self.capture_card_status_label.config(
+                    text=f"Status: Running ({width}x{height}) | "
+                         f"Dropped: {self.capture_card_ring.dropped} | Duplicate: {self.capture_card_ring.duplicates}",
+                    foreground="green")
+            if self.recorder is not None:
+                self.recorder_status_label.config(
+                    text=f"Recorder: {self.recorder.written} written | {self.recorder.dropped} dropped | "
+                         f"{self.recorder.queue.qsize()} queued",
+                    foreground="red" if self.recorder.dropped else "green")
             self.last_time = now
             self.frame_count = 0
 
-        self.root.after(10, self.update_image)
+        # Fast replay runs the loop back to back to measure pipeline throughput
+        if self.capture_source.get() == 'replay' and self.replay_pacing.get() == 'fast':
+            self.root.after(1, self.update_image)
+        else:
+            self.root.after(10, self.update_image)
 
 
 # Launch the app
+def benchmark_multi_roi(spec='4x2', size=512, repeats=20, model_path=None, backend='onnxruntime'):
+    """Print batched vs per-region detection timings for a multi-ROI spec on a synthetic frame.
+
+    The classical detector runs on an app without a window, its settings held by a bare Tcl
+    interpreter, at the default detection settings. With model_path, YOLO's batched call is
+    timed against one call per region as well.
+    """
+    rng = np.random.default_rng(0)
+    frame = np.full((1024, 2048), 200, dtype=np.uint8)
+    for _ in range(48):
+        cx, cy = int(rng.integers(40, 2008)), int(rng.integers(40, 984))
+        cv2.circle(frame, (cx, cy), int(rng.integers(8, 30)), 30, -1)
+    frame = cv2.add(frame, rng.integers(0, 20, frame.shape, dtype=np.uint8))
+    rois = parse_roi_spec(spec, frame.shape[1], frame.shape[0])[:8]
+
+    interp = tk.Tcl()
+    app = ScreenGrabberApp.__new__(ScreenGrabberApp)
+    app.img_size = size
+    app.buffers = {}
+    app.fast_blur_min_kernel = {'uint8': 15, 'float32': 51}
+    app.search_state = None
+    app.search_window_active = None
+    for name, var in (('blur_var', tk.IntVar(interp, 15)), ('thresh_var', tk.DoubleVar(interp, 0.5)),
+                      ('invert_var', tk.BooleanVar(interp, True)), ('margin_var', tk.IntVar(interp, 5)),
+                      ('area_lb_var', tk.IntVar(interp, 400)), ('area_ub_var', tk.IntVar(interp, 90000)),
+                      ('fast_blur', tk.BooleanVar(interp, True)), ('window_search', tk.BooleanVar(interp, False))):
+        setattr(app, name, var)
+
+    stack = app.preprocess_rois(frame, rois)
+    inverted = [cv2.bitwise_not(img) for img in stack]
+    timings = []
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        app.detect_rois_classical(stack)
+    t_batched = (time.perf_counter() - start) / repeats
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for img in inverted:
+            app.classical_detect(img)
+    timings.append(('classical', t_batched, (time.perf_counter() - start) / repeats))
+
+    if model_path:
+        if backend == 'pytorch':
+            model = UltralyticsBackend(model_path)
+        else:
+            model = ExportedYOLOBackend(model_path, backend, default_imgsz=size)
+        imgs = [cv2.cvtColor(img, cv2.COLOR_GRAY2RGB) for img in stack]
+        warmup_model(model, size, max_batch=len(imgs))
+        start = time.perf_counter()
+        for _ in range(repeats):
+            model.predict_batch(imgs, 0.5, size)
+        t_batched = (time.perf_counter() - start) / repeats
+        start = time.perf_counter()
+        for _ in range(repeats):
+            for img in imgs:
+                model.predict(img, 0.5, size)
+        label = 'yolo' if model.batch_dynamic else 'yolo (static batch)'
+        timings.append((label, t_batched, (time.perf_counter() - start) / repeats))
+
+    print(f"{len(rois)} regions ({spec}) at {size}px")
+    print(f"{'detector':>20} {'batched ms':>11} {'per-ROI ms':>11} {'speedup':>8}")
+    for label, t_batched, t_separate in timings:
+        print(f"{label:>20} {t_batched * 1e3:>11.2f} {t_separate * 1e3:>11.2f} {t_separate / t_batched:>7.2f}x")
+
+
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
+
+    parser = argparse.ArgumentParser(description="fastTomo particle tracking for tomography")
+    parser.add_argument("--benchmark-blur", action="store_true",
+                        help="compare GaussianBlur and the box-filter blur, then exit")
+    parser.add_argument("--benchmark-multi-roi", action="store_true",
+                        help="compare batched and per-region detection for --roi-spec, then exit")
+    parser.add_argument("--roi-spec", default="4x2",
+                        help="multi-ROI spec for --benchmark-multi-roi (default: 4x2)")
+    parser.add_argument("--yolo-model", metavar="MODEL",
+                        help="also benchmark this YOLO model with --benchmark-multi-roi")
+    parser.add_argument("--backend", choices=YOLO_BACKENDS, default='onnxruntime',
+                        help="inference backend for --yolo-model (default: onnxruntime)")
+    parser.add_argument("--export-yolo", metavar="MODEL_PT",
+                        help="export a YOLO .pt model for CPU inference, then exit")
+    parser.add_argument("--format", choices=('onnx', 'openvino'), default='onnx',
+                        help="export format for --export-yolo (default: onnx)")
+    parser.add_argument("--imgsz", type=int, default=512,
+                        help="input size for export and benchmarks; match the processing size (default: 512)")
+    parser.add_argument("--quantize-yolo", metavar="MODEL",
+                        help="quantize a .pt or .onnx YOLO model to INT8 using recorded frames, then exit")
+    parser.add_argument("--frames", metavar="DIR",
+                        help="recording folder with chunk_*.npy frames for --quantize-yolo calibration")
+    parser.add_argument("--dynamic", action="store_true",
+                        help="export with a dynamic input size so ROI inference can use smaller crops")
+    args = parser.parse_args()
+
+    if args.benchmark_blur:
+        benchmark_blur()
+        sys.exit(0)
+    if args.benchmark_multi_roi:
+        benchmark_multi_roi(args.roi_spec, args.imgsz, model_path=args.yolo_model, backend=args.backend)
+        sys.exit(0)
+    if args.export_yolo:
+        print(f"Exported: {export_yolo_model(args.export_yolo, args.format, args.imgsz, args.dynamic)}")
+        sys.exit(0)
+    if args.quantize_yolo:
+        if not args.frames:
+            parser.error("--quantize-yolo needs --frames")
+        quantized, report = quantize_yolo_model(args.quantize_yolo, args.frames, args.imgsz)
+        print(f"Quantized: {quantized}")
+        print(f"INT8 vs FP32 on {format_quantization_report(report)}")
+        sys.exit(0)
+
     root = tk.Tk()
     app = ScreenGrabberApp(root)
     
     # Clean up on close
     def on_closing():
         app.stop_capture_card()
-        app.stop_yolo_thread()
+        app.stop_mss_capture()
+        app.close_replay()
+        app.stop_recorder(wait=True)
+        app.stop_yolo_worker()
+        if app.yolo_loading_worker is not None:
+            app.yolo_loading_worker.close()
         root.destroy()
     
     root.protocol("WM_DELETE_WINDOW", on_closing)